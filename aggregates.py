@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental leaderboard aggregation.
+
+Running per-player and per-team totals (points, maps played, rank sums and
+top-1 counts) are kept between fetches. When maps change, only their old
+rows are subtracted and their new rows added, so a refresh costs
+O(changed rows) instead of a full recomputation over every record.
+"""
+import sys
+from collections import Counter
+import numpy as np
+import pandas as pd
+from score import POINTS_TABLE, rank_points, scoring_function
+
+
+class _Totals:
+    __slots__ = ("points", "rank_sum", "rank_count", "top1", "maps")
+
+    def __init__(self):
+        self.points = 0
+        self.rank_sum = 0.0
+        self.rank_count = 0
+        self.top1 = 0
+        self.maps = Counter()  # map key -> rows, so maps played = len(maps)
+
+    def add(self, sign, points, rank, map_key):
+        self.points += sign * points
+        if rank == rank:  # not NaN
+            self.rank_sum += sign * rank
+            self.rank_count += sign
+            self.top1 += sign * (rank == 1)
+        self.maps[map_key] += sign
+        if not self.maps[map_key]:
+            del self.maps[map_key]
+
+    def empty(self):
+        return not self.maps
+
+
+class LeaderboardAggregator:
+    """
+    Args:
+        team_of (dict): lowercased login -> team name (e.g. from teams.csv).
+        table: rank-to-points table (see score.POINTS_TABLE).
+    """
+
+    def __init__(self, team_of=None, table=POINTS_TABLE):
+        self.team_of = team_of or {}
+        self.table = table
+        self._rows = {}         # MapUID -> rows currently counted for that map
+        self.players = {}       # (Login, NickName) -> _Totals, maps keyed by Challenge
+        self.teams = {}         # team -> _Totals, maps keyed by MapUID
+        self.team_players = {}  # (team, NickName) -> [points, rows]
+
+    def update(self, df, changed_uids=None):
+        """
+        Apply the rows of `df` for the maps in `changed_uids` (all maps of `df`
+        when None, or on the first update). Maps listed but absent from `df`
+        are removed. Returns the number of rows applied.
+        """
+        if changed_uids is None or not self._rows:
+            changed_uids = set(self._rows) | set(df["MapUID"].unique())
+        changed_uids = set(changed_uids)
+        if not changed_uids:
+            return 0
+
+        part = df[df["MapUID"].isin(list(changed_uids))]
+        rows = pd.DataFrame({
+            "MapUID": part["MapUID"].astype(object),
+            "Login": part["Login"].astype(object),
+            "NickName": part["NickName"].astype(object),
+            "Challenge": part["Challenge"].astype(object),
+            "Rank": part["Rank"].astype("float64"),
+            "Points": rank_points(part["Rank"], self.table),
+        })
+        rows = rows.dropna(subset=["Login"])
+        new_rows = {uid: [] for uid in changed_uids}
+        for row in rows.itertuples(index=False):
+            new_rows[row.MapUID].append(row)
+
+        applied = 0
+        for uid in changed_uids:
+            for row in self._rows.pop(uid, []):
+                self._apply(-1, row)
+            for row in new_rows[uid]:
+                self._apply(1, row)
+            if new_rows[uid]:
+                self._rows[uid] = new_rows[uid]
+            applied += len(new_rows[uid])
+        return applied
+
+    def _apply(self, sign, row):
+        has_nickname = row.NickName == row.NickName  # scoring_function drops NaN groups
+        if has_nickname:
+            key = (row.Login, row.NickName)
+            totals = self.players.get(key)
+            if totals is None:
+                totals = self.players[key] = _Totals()
+            totals.add(sign, row.Points, row.Rank, row.Challenge)
+            if totals.empty():
+                del self.players[key]
+
+        team = self.team_of.get(str(row.Login).lower())
+        if team is None or team != team:
+            return
+        team_totals = self.teams.get(team)
+        if team_totals is None:
+            team_totals = self.teams[team] = _Totals()
+        team_totals.add(sign, row.Points, row.Rank, row.MapUID)
+        if team_totals.empty():
+            del self.teams[team]
+        if not has_nickname:
+            return
+        member = self.team_players.setdefault((team, row.NickName), [0, 0])
+        member[0] += sign * row.Points
+        member[1] += sign
+        if not member[1]:
+            del self.team_players[(team, row.NickName)]
+
+    # ---------------------------
+    # Frames
+    # ---------------------------
+    def players_frame(self):
+        """Same columns as score.scoring_function, plus Top1_Count."""
+        keys = list(self.players)
+        totals = [self.players[k] for k in keys]
+        rank_count = np.array([t.rank_count for t in totals], dtype="float64")
+        rank_sum = np.array([t.rank_sum for t in totals], dtype="float64")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            average = np.where(rank_count > 0, rank_sum / rank_count, np.nan)
+        frame = pd.DataFrame({
+            "Login": [k[0] for k in keys],
+            "NickName": [k[1] for k in keys],
+            "Points": np.array([t.points for t in totals], dtype="int64"),
+            "Maps_Played": np.array([len(t.maps) for t in totals], dtype="int64"),
+            "Average_Rank": average,
+            "Top1_Count": np.array([t.top1 for t in totals], dtype="int64"),
+        })
+        # Same row order as the scoring_function groupby
+        return frame.sort_values(["Login", "NickName"]).reset_index(drop=True)
+
+    def teams_frame(self):
+        """Team totals sorted by Score, in the layout of the team_scores panel."""
+        teams = list(self.teams)
+        totals = [self.teams[t] for t in teams]
+        frame = pd.DataFrame({
+            "team": teams,
+            "Score": np.array([t.points for t in totals], dtype="int64"),
+            "Maps_Played": np.array([len(t.maps) for t in totals], dtype="int64"),
+            "Rank_Sum": np.array([t.rank_sum for t in totals], dtype="float64"),
+            "Top1_Count": np.array([t.top1 for t in totals], dtype="int64"),
+        })
+        return frame.sort_values("Score", ascending=False).reset_index(drop=True)
+
+    def team_players_frame(self):
+        """Points per (team, NickName), best first within each team."""
+        frame = pd.DataFrame(
+            [(team, nick, points) for (team, nick), (points, _) in self.team_players.items()],
+            columns=["team", "NickName", "Score"],
+        ).astype({"Score": "int64"})
+        return frame.sort_values(["team", "Score"], ascending=[True, False]).reset_index(drop=True)
+
+
+def full_recomputation_mismatches(agg, df):
+    """
+    Compare `agg` with a full recomputation over `df`; returns a list of
+    human-readable mismatches (empty when both agree).
+    """
+    problems = []
+    expected = scoring_function(df)
+    expected = expected.astype({"Login": object, "NickName": object}).set_index(["Login", "NickName"]).sort_index()
+    actual = agg.players_frame().set_index(["Login", "NickName"]).sort_index()
+    if not expected.index.equals(actual.index):
+        problems.append(f"players differ: {len(expected)} expected, {len(actual)} aggregated")
+    else:
+        for col in ["Points", "Maps_Played"]:
+            if not (expected[col].to_numpy() == actual[col].to_numpy()).all():
+                problems.append(f"{col} differs")
+        if not np.allclose(expected["Average_Rank"], actual["Average_Rank"], equal_nan=True, rtol=1e-5):
+            problems.append("Average_Rank differs")
+
+    from panels import build_team_panels
+    teams_df = pd.DataFrame({"login": list(agg.team_of), "team": list(agg.team_of.values())})
+    team_scores, team_players = build_team_panels(df, teams_df)
+    actual_scores = agg.teams_frame()[["team", "Score"]]
+    if not _same_rows(team_scores, actual_scores, ["team"]):
+        problems.append("team scores differ")
+    if not _same_rows(team_players.astype({"NickName": object}), agg.team_players_frame(), ["team", "NickName"]):
+        problems.append("team players differ")
+    return problems
+
+
+def _same_rows(a, b, key):
+    a = a.sort_values(key).reset_index(drop=True)
+    b = b.sort_values(key).reset_index(drop=True)
+    return a.astype(b.dtypes.to_dict()).equals(b)
+
+
+if __name__ == "__main__":
+    # Randomized check against full recomputation: python aggregates.py [rounds]
+    from panels import team_lookup
+    from store import load_snapshot
+
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = np.random.default_rng(0)
+    df = load_snapshot().dropna(subset=["Login", "NickName"]).reset_index(drop=True)
+    agg = LeaderboardAggregator(team_of=team_lookup())
+    agg.update(df)
+    uids = df["MapUID"].unique()
+
+    for n in range(rounds):
+        changed = set(rng.choice(uids, size=rng.integers(1, 5), replace=False))
+        on_changed = df["MapUID"].isin(list(changed))
+        part = df[on_changed].copy()
+        # Rank churn, a new rank 1, rows falling out of the top 30, new entrants
+        part["Rank"] = rng.permutation(part["Rank"].to_numpy())
+        part = part[part["Rank"] <= rng.integers(20, 41)]
+        entrants = part.head(2).assign(Login=[f"new_{n}_{i}" for i in range(min(2, len(part)))])
+        df = pd.concat([df[~on_changed], part, entrants], ignore_index=True)
+        agg.update(df, changed)
+        problems = full_recomputation_mismatches(agg, df)
+        if problems:
+            print(f"❌ Round {n}: {problems}")
+            sys.exit(1)
+    print(f"✅ Incremental totals matched the full recomputation over {rounds} rounds")
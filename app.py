@@ -5,15 +5,26 @@ Created on Mon Oct  6 23:00:18 2025
 @author: Hola
 """
 
+import os
 import streamlit as st
 import pandas as pd
+from datetime import datetime
 import streamlit.components.v1 as components
-from datetime import datetime, timedelta
-from renders import render_html_table, render_score_table,top_border,time_ago
-from score import scoring_function
-from fetcher import start_background_thread, latest_df,last_updated
+from renders import render_html_table, render_score_table, render_recent_records, top_border, dashboard_panel, render_dashboard
+from store import SNAPSHOT_PATH, load_snapshot
+from panels import materialize
+from fetcher import start_background_thread, snapshots
+from shared_snapshot import SharedSnapshots
 from dotenv import load_dotenv
 
+
+def configure_pandas():
+    # Snapshot views handed to sessions must never write through to the shared frame
+    pd.set_option("mode.copy_on_write", True)
+
+if __name__ == "__main__":  # `streamlit run app.py`, not a page importing current_snapshot
+    configure_pandas()
+
 # ---------------------------
 # CONFIG
 # ---------------------------
@@ -43,180 +54,159 @@ st.markdown("""
 # ---------------------------
 
 
-start_background_thread()
 load_dotenv()
+if os.getenv("DEDI_WORKER") == "external":
+    # Crawled by worker.py in its own process: attach to its shared snapshot file
+    snapshots = SharedSnapshots()
+else:
+    start_background_thread()
+
+def current_snapshot(path=SNAPSHOT_PATH):
+    # Latest fetched data; the on-disk snapshot until the first fetch lands
+    return snapshots.publish_if_empty(lambda: materialize(load_snapshot(path)))
+
+def load_data(path=SNAPSHOT_PATH):
+    # Copy-on-write view of the frame shared by every session
+    return current_snapshot(path).view()
+
+POLL_SECONDS = float(os.getenv("DEDI_POLL_SECONDS", "30"))  # how often open pages look for new data
+ALL_TEAMS = "All teams"
+PAGE_SIZES = [25, 50, 100, 200]
+
+def jump_to_player(ranking):
+    # Search box callback: move the leaderboard to the page of the first match
+    team = st.session_state.get("solo_team", ALL_TEAMS)
+    team = None if team == ALL_TEAMS else team
+    found = ranking.find(st.session_state.solo_query, team=team)
+    st.session_state.solo_not_found = st.session_state.solo_query if found is None else None
+    if found is not None:
+        st.session_state.solo_page = found // st.session_state.get("solo_size", PAGE_SIZES[1]) + 1
+
+def first_page():
+    st.session_state.solo_page = 1
+
+def solo_controls(ranking):
+    # Search, team, page size and page widgets of the solo leaderboard
+    c_search, c_team, c_size, c_page = st.columns([3, 2, 1, 1])
+    team = c_team.selectbox("Team", [ALL_TEAMS] + ranking.teams(), key="solo_team", on_change=first_page)
+    team = None if team == ALL_TEAMS else team
+    size = c_size.selectbox("Per page", PAGE_SIZES, index=1, key="solo_size", on_change=first_page)
+    c_search.text_input("Find player (login or nickname)", key="solo_query", on_change=jump_to_player, args=(ranking,))
+    n_pages = ranking.page_count(size, team)
+    if st.session_state.get("solo_page", 1) > n_pages:
+        st.session_state.solo_page = n_pages
+    page = c_page.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, key="solo_page")
+    if st.session_state.get("solo_not_found"):
+        st.caption(f"No player matches '{st.session_state.solo_not_found}'")
+    return team, size, page
+
+# Every panel below is its own fragment polling alone every POLL_SECONDS: a
+# new snapshot only redraws the panels, and those whose content version is
+# unchanged come straight from the fragment cache with identical HTML.
+
+@st.fragment(run_every=POLL_SECONDS)
+def watch_layout(shown_panels):
+    # The whole page only reruns when the set of panels itself changes
+    if tuple(current_snapshot().panel_versions) != shown_panels:
+        st.rerun()
+
+@st.fragment(run_every=POLL_SECONDS)
+def header():
+    snapshot = current_snapshot()
+    top_border(snapshot.frame, snapshot.fetched_at)
+
+@st.fragment(run_every=POLL_SECONDS)
+def recent_records():
+    snapshot = current_snapshot()
+    # Labels are "x min ago": rebuild at most once a minute
+    minute = datetime.utcnow().replace(second=0, microsecond=0)
+    html = render_recent_records(snapshot.panels["recent_records"], key=("recent_records", (snapshot.panel_versions["recent_records"], minute)))
+    components.html(html, height=400, scrolling=True)
+
+@st.fragment(run_every=POLL_SECONDS)
+def table_panel(name, title, columns):
+    snapshot = current_snapshot()
+    html = render_html_table(title, snapshot.panels[name], columns=columns, key=(name, snapshot.panel_versions[name]))
+    components.html(html, height=400, scrolling=True)
+
+@st.fragment(run_every=POLL_SECONDS)
+def solo_leaderboard():
+    # Paging or searching also reruns only the leaderboard
+    snapshot = current_snapshot()
+    ranking = snapshot.panels["solo_ranking"]
+    team, size, page = solo_controls(ranking)
+    components.html(
+        render_score_table(
+            "🔥 Solo Leaderboards", ranking.page(page, size, team),
+            columns=['Position', 'NickName', 'Points', 'Maps_Played', 'Average_Rank', 'Login'],
+            key=("solo_leaderboard", (snapshot.panel_versions["solo_ranking"], team, size, page)),
+            offset=(page - 1) * size,
+        ),
+        height=800, scrolling=True,
+    )
 
-@st.cache_data(ttl=3600)
-def load_data(path):
-    # If available, use latest data; otherwise load cached CSV
-    if latest_df is not None:
-        df = latest_df.copy()
-    else:
-        df = pd.read_csv("./resources/dedimania_all_records.csv")
-    
-    df["Record"] = pd.to_numeric(df["Record"], errors="coerce")
-    # Try to parse date
-    df["RecordDate"] = pd.to_datetime(df["RecordDate"], errors="coerce", dayfirst=True)
-    df['Rank'] = pd.to_numeric(df['Rank'], errors='coerce')
-
-    df = df.dropna(subset=["RecordDate"])
-    return df
+@st.fragment(run_every=POLL_SECONDS)
+def dashboard_bundle():
+    # Leaderboard controls and new snapshots only rebuild the bundle
+    snapshot = current_snapshot()
+    panels, versions = snapshot.panels, snapshot.panel_versions
+    ranking = panels["solo_ranking"]
+    team, size, page = solo_controls(ranking)
+    bundle = [
+        dashboard_panel("recent_records", "🕒 Latest records", "records", panels["recent_records"], versions["recent_records"], span=4),
+        dashboard_panel("top_players", "🥇 Top Players by #1 Ranks", "table", panels["top_players"], versions["top_players"], ["NickName", "Top1_Count"], span=2),
+        dashboard_panel("active_maps", "🔥 Most Active Maps (Last 7 Days)", "table", panels["active_maps"], versions["active_maps"], ["Challenge", "NewRecords"], span=3),
+        dashboard_panel("player_most_records", "🔥 Top dedi presence", "table", panels["player_most_records"], versions["player_most_records"], ["NickName", "Login", "MostRecords"], span=3),
+        dashboard_panel(
+            "solo_leaderboard", "🔥 Solo Leaderboards", "score", ranking.page(page, size, team),
+            (versions["solo_ranking"], team, size, page), offset=(page - 1) * size,
+        ),
+    ]
+    # Panels this session already received are sent without their rows
+    html, st.session_state.dashboard_sent = render_dashboard(bundle, st.session_state.get("dashboard_sent"))
+    components.html(html, height=1900, scrolling=True)
 
 uploaded = True
 
 
 if uploaded:
-    df = load_data("./resources/dedimania_all_records.csv")
-    
-    # --- Data preparation ---
-    df["RecordDate"] = pd.to_datetime(df["RecordDate"], format="%d/%m/%Y %H:%M")
-    df["Record"] = pd.to_numeric(df["Record"], errors="coerce")
-
-    # --- Top 5 recent records ---
-    recent_records = df.sort_values("RecordDate", ascending=False).head(100)[
-        ["Challenge", "NickName", "Record", "Rank", "RecordDate"]
-    ]
-    recent_records = recent_records.copy()
-    recent_records["RecordDate"] = recent_records["RecordDate"].apply(time_ago)
-
-    # --- Most disputed maps ---
-    seven_days_ago = datetime.now() - timedelta(days=7)
-    recent_df = df[df["RecordDate"] >= seven_days_ago]
-    recent_df = recent_df.copy()
-    recent_df["RecordDate"] = recent_df["RecordDate"].apply(time_ago)
-    active_maps = (
-    recent_df.groupby(["Challenge"])
-    .size()
-    .reset_index(name="NewRecords")
-    .sort_values("NewRecords", ascending=False)
-    .head(10)
-    )
-
-    # --- Player most records ---
-       
-    player_most_records = (
-    df.groupby(["NickName", "Login"])
-    .size()
-    .reset_index(name="MostRecords")
-    .sort_values("MostRecords", ascending=False)
-    .head(10)
-    )
-    
-    # --- Top players (best record overall) ---
-    top_players = (
-        df[df["Rank"].astype(float) == 1]
-        .groupby(["Login", "NickName"])
-        .size()
-        .reset_index(name="Top1_Count")
-        .sort_values("Top1_Count", ascending=False)
-        .head(10)
-    )
+    snapshot = current_snapshot()
+    watch_layout(tuple(snapshot.panel_versions))
 
     # --- Page Title ---
     st.markdown("## 🏁 Dodo challenge leaderboard")
     # Little gadget at the top
-    top_border(df) 
-    
-    
-    col1, col2 = st.columns([2, 1], gap="large")
+    header()
+
+    single_frame = st.sidebar.toggle(
+        "Single-frame dashboard", value=os.getenv("DEDI_DASHBOARD") == "single",
+        help="Render every panel in one frame and only resend the panels that changed",
+    )
 
+    # --- Panels precomputed once per snapshot (see panels.build_panels) ---
+    if single_frame:
+        dashboard_bundle()
+    else:
+        col1, col2 = st.columns([2, 1], gap="large")
 
-    
-    # === LEFT: Top 5 Recent Records ===
-    with col1:
-        st.markdown("### 🕒 Latest records")
-
-        # ✅ Combine CSS + HTML inside components.html
-        html = """
-        <html>
-        <head>
-        <style>
-        body {
-            background-color: transparent;
-            color: #e6edf3;
-            font-family: 'Segoe UI', Roboto, sans-serif;
-        }
-        .records-box {
-            background: linear-gradient(145deg, #1a1d25, #11141a);
-            border-radius: 14px;
-            box-shadow: 0 4px 12px rgba(0,0,0,0.5);
-            padding: 1.2em;
-            margin-top: 0.5em;
-        }
-        table {
-            width: 100%;
-            border-collapse: collapse;
-        }
-        th {
-            text-align: left;
-            padding: 0.5em;
-            color: #8b949e;
-            border-bottom: 1px solid #2d313a;
-            font-size: 0.9em;
-        }
-        td {
-            padding: 0.6em;
-            border-bottom: 1px solid #2d313a;
-            font-size: 0.95em;
-        }
-        tr:hover {
-            background-color: rgba(88,166,255,0.08);
-            transition: background 0.2s ease;
-        }
-        .nickname { color: #58a6ff; font-weight: 600; }
-        .record { color: #3fb950; font-weight: 600; }
-        .rank { color: #f1c40f; font-weight: 600; }
-        </style>
-        </head>
-        <body>
-        <div class="records-box">
-            <table>
-                <thead>
-                    <tr>
-                        <th>Challenge</th>
-                        <th>Nickname</th>
-                        <th>Record</th>
-                        <th>Rank</th>
-                        <th>Set on</th>
-                    </tr>
-                </thead>
-                <tbody>
-        """
-
-        # Add rows dynamically
-        for _, row in recent_records.iterrows():
-            html += f"""
-                <tr>
-                    <td>{row['Challenge']}</td>
-                    <td class="nickname">{row['NickName']}</td>
-                    <td class="record">{row['Record']:.2f}</td>
-                    <td class="rank">{int(row['Rank'])}</td>
-                    <td>{row['RecordDate']}</td>
-                </tr>
-            """
-
-        html += """
-                </tbody>
-            </table>
-        </div>
-        </body></html>
-        """
-
-        # ✅ Render styled HTML table
-        components.html(html, height=400, scrolling=True)
-
-    ## === RIGHT: Top Players by Top-1 Finishes ===
-    with col2:
-        components.html(render_html_table("🥇 Top Players by #1 Ranks", top_players, columns=["NickName", "Top1_Count"]), height=400, scrolling=True)
+        # === LEFT: Top 5 Recent Records ===
+        with col1:
+            st.markdown("### 🕒 Latest records")
+            recent_records()
+
+        ## === RIGHT: Top Players by Top-1 Finishes ===
+        with col2:
+            table_panel("top_players", "🥇 Top Players by #1 Ranks", ["NickName", "Top1_Count"])
 
         
-    col3, col4 = st.columns([1, 1], gap="medium")
+        col3, col4 = st.columns([1, 1], gap="medium")
 
-    # === LEFT: Top 5 Recent Records ===
-    with col3:
-        components.html(render_html_table("🔥 Most Active Maps (Last 7 Days)", active_maps, columns=["Challenge", "NewRecords"]), height=400, scrolling=True)
+        # === LEFT: Top 5 Recent Records ===
+        with col3:
+            table_panel("active_maps", "🔥 Most Active Maps (Last 7 Days)", ["Challenge", "NewRecords"])
     
-    with col4:
-        components.html(render_html_table("🔥 Top dedi presence", player_most_records, columns=["NickName", "Login", "MostRecords"]), height=400, scrolling=True)
-        
-    components.html(render_score_table("🔥 Solo Leaderboards", scoring_function(df), columns=['NickName', 'Points', 'Maps_Played', 'Average_Rank', 'Login']), height=800, scrolling=True)
+        with col4:
+            table_panel("player_most_records", "🔥 Top dedi presence", ["NickName", "Login", "MostRecords"])
+
+        # === Solo leaderboard, one page at a time (see leaderboard.RankIndex) ===
+        solo_leaderboard()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Microbenchmark: dedi_parser against the previous BeautifulSoup + cutlines
+pipeline, on the saved Dedimania pages in resources/fixtures.
+
+Usage: python bench_parser.py [repeats]
+"""
+import os
+import sys
+import timeit
+from bs4 import BeautifulSoup
+from dedi_parser import HEADER_FIELDS, parse_records
+
+FIXTURES_DIR = "./resources/fixtures"
+
+
+def legacy_parse(html):
+    """The parsing path fetch_dedi used before dedi_parser (kept for comparison)."""
+    soup = BeautifulSoup(html, "html.parser")
+    lines = [line.strip() for line in soup.get_text("\n", strip=True).split("\n") if line.strip()]
+
+    start_idx = None
+    for i in range(len(lines) - len(HEADER_FIELDS)):
+        if lines[i:i + len(HEADER_FIELDS)] == list(HEADER_FIELDS):
+            start_idx = i + len(HEADER_FIELDS)
+            break
+    end_idx = None
+    for i, line in enumerate(lines):
+        if line.strip().lower().startswith("limit"):
+            end_idx = i
+            break
+    lines = lines[start_idx:end_idx] if start_idx is not None and end_idx is not None else []
+
+    records = []
+    for i, line in enumerate(lines):
+        if line == "TMU" and i + 11 < len(lines):
+            records.append(dict(zip(HEADER_FIELDS, lines[i:i + 12])))
+    return records
+
+
+def load_fixtures():
+    pages = {}
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith(".html"):
+            with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+                pages[name] = f.read()
+    return pages
+
+
+def main(repeats=20):
+    pages = load_fixtures()
+    print(f"{len(pages)} fixture pages from {FIXTURES_DIR}")
+
+    for name, html in pages.items():
+        legacy = legacy_parse(html)
+        columns = parse_records(html)
+        n = len(columns["Game"])
+        aligned = sum(
+            all(rec[f] == columns[f][i] for f in HEADER_FIELDS)
+            for i, rec in enumerate(legacy[:n])
+        )
+        print(f"  {name}: {n} rows (legacy: {len(legacy)} rows, {aligned} identical)")
+
+    for label, func in (("legacy bs4+cutlines", legacy_parse), ("dedi_parser", parse_records)):
+        seconds = min(timeit.repeat(
+            lambda: [func(html) for html in pages.values()], number=repeats, repeat=3
+        ))
+        per_page = seconds / (repeats * len(pages)) * 1000
+        print(f"{label:>20}: {per_page:.3f} ms/page")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
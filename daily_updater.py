@@ -1,42 +1,147 @@
 # daily_updater.py
+"""
+Local copy of player_daily_scores, kept in sync incrementally.
+
+Rows are stored as Parquet, one partition per day (date=YYYY-MM-DD/), so a
+sync only fetches the days after the newest local one and rewrites just those
+partitions, and readers only open the days of the range they show. The newest
+local day is the high-water mark; it is fetched again on every sync because
+store_daily_scores may still update it.
+"""
 import os
 import pandas as pd
 import psycopg2
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import threading
 import time
-from datetime import datetime
+from datetime import date, datetime
 from dotenv import load_dotenv
 
-CSV_PATH = "./resources/daily_player_points.csv"
+POINTS_DIR = "./resources/daily_points"
+PLAYERS_FILE = "players.parquet"  # login -> latest nickname, next to the partitions
+COLUMNS = ["login", "nickname", "score", "recorded_at"]
 _updater_thread = None  # internal guard variable
 
 
-def fetch_daily_scores_from_db():
-    """Fetch all player_daily_scores rows from Neon and write to CSV once per day."""
+def synced_days(root=POINTS_DIR):
+    """Days present locally, oldest first."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        date.fromisoformat(name[len("date="):])
+        for name in os.listdir(root)
+        if name.startswith("date=")
+    )
+
+
+def high_water_mark(root=POINTS_DIR):
+    days = synced_days(root)
+    return days[-1] if days else None
+
+
+def sync_daily_scores(root=POINTS_DIR):
+    """
+    Fetch the player_daily_scores rows from the high-water mark on (everything
+    on the first sync) and store them; returns the number of rows fetched.
+    """
     load_dotenv()
+    since = high_water_mark(root)
+    query = "SELECT login, nickname, score, recorded_at FROM player_daily_scores"
+    params = None
+    if since is not None:
+        query += " WHERE recorded_at >= %s"
+        params = (since,)
+    query += " ORDER BY recorded_at ASC, login ASC;"
+
+    started = time.perf_counter()
     conn = psycopg2.connect(os.getenv("DATABASE_URL"))
-    query = """
-        SELECT login, nickname, score, recorded_at
-        FROM player_daily_scores
-        ORDER BY recorded_at ASC;
+    try:
+        df = pd.read_sql_query(query, conn, params=params)
+    finally:
+        conn.close()
+
+    write_days(df, root)
+    print(
+        f"💾 Synced {len(df)} daily score rows since {since or 'the beginning'} "
+        f"in {time.perf_counter() - started:.1f}s at {datetime.now()}",
+        flush=True,
+    )
+    return len(df)
+
+
+def write_days(df, root=POINTS_DIR):
+    """Replace the partition of every day present in `df` and update the players table."""
+    if df.empty:
+        return
+    df = df[COLUMNS].copy()
+    df["recorded_at"] = pd.to_datetime(df["recorded_at"])
+    df["score"] = df["score"].astype("float64")
+    for day, rows in df.groupby(df["recorded_at"].dt.date):
+        day_dir = os.path.join(root, f"date={day.isoformat()}")
+        os.makedirs(day_dir, exist_ok=True)
+        _write_atomic(rows.sort_values("login"), os.path.join(day_dir, "part-0.parquet"))
+
+    # Latest nickname of every player, so pages can list players without reading history
+    latest = df.sort_values("recorded_at").drop_duplicates("login", keep="last")[["login", "nickname"]]
+    players_path = os.path.join(root, PLAYERS_FILE)
+    if os.path.exists(players_path):
+        latest = pd.concat([pd.read_parquet(players_path), latest]).drop_duplicates("login", keep="last")
+    _write_atomic(latest.sort_values("login"), players_path)
+
+
+def sync_version(root=POINTS_DIR):
+    """Changes whenever a sync stored new rows; key caches of the local data on it."""
+    path = os.path.join(root, PLAYERS_FILE)
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+
+
+def load_players(root=POINTS_DIR):
+    """Every synced player (login, nickname), without reading the history."""
+    path = os.path.join(root, PLAYERS_FILE)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=["login", "nickname"])
+    return pd.read_parquet(path)
+
+
+def load_points(start=None, end=None, logins=None, root=POINTS_DIR):
+    """
+    Daily scores between `start` and `end` (inclusive days), optionally only
+    for `logins`. Only the partitions of the range are opened and only the
+    requested players' rows are materialized.
     """
-    df = pd.read_sql_query(query, conn)
-    conn.close()
+    days = synced_days(root)
+    if start is not None:
+        days = [d for d in days if d >= pd.Timestamp(start).date()]
+    if end is not None:
+        days = [d for d in days if d <= pd.Timestamp(end).date()]
+    if not days:
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in
+                             zip(COLUMNS, ["object", "object", "float64", "datetime64[ns]"])})
 
+    files = [os.path.join(root, f"date={d.isoformat()}", "part-0.parquet") for d in days]
+    dataset = ds.dataset(files, format="parquet")
+    condition = ds.field("login").isin(list(logins)) if logins is not None else None
+    table = dataset.to_table(columns=COLUMNS, filter=condition)
+    df = table.to_pandas()
     df["recorded_at"] = pd.to_datetime(df["recorded_at"])
-    os.makedirs(os.path.dirname(CSV_PATH), exist_ok=True)
-    df.to_csv(CSV_PATH, index=False, encoding="utf-8")
-    print(f"💾 Updated {CSV_PATH} with {len(df)} rows at {datetime.now()}", flush=True)
     return df
 
 
+def _write_atomic(df, path):
+    tmp_path = f"{path}.tmp"
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+
 def _loop(interval_hours: float):
-    """Background loop that refreshes daily_player_points.csv every N hours."""
+    """Background loop syncing the new daily scores every N hours."""
     while True:
         try:
-            fetch_daily_scores_from_db()
+            sync_daily_scores()
         except Exception as e:
-            print(f"⚠️ Error fetching daily scores: {e}", flush=True)
+            print(f"⚠️ Error syncing daily scores: {e}", flush=True)
         time.sleep(interval_hours * 3600)
 
 
@@ -48,13 +153,13 @@ def start_daily_updater(interval_hours=24):
         print("ℹ️ Daily updater already running, skipping new thread.", flush=True)
         return
 
-    # Ensure the CSV exists on first boot
-    if not os.path.exists(CSV_PATH):
-        print("📄 No CSV found, creating initial daily_player_points.csv...", flush=True)
+    # Ensure local data exists on first boot
+    if high_water_mark() is None:
+        print("📄 No local daily scores found, running the initial sync...", flush=True)
         try:
-            fetch_daily_scores_from_db()
+            sync_daily_scores()
         except Exception as e:
-            print(f"⚠️ Could not create initial CSV: {e}", flush=True)
+            print(f"⚠️ Could not run the initial sync: {e}", flush=True)
 
     # Start background thread
     _updater_thread = threading.Thread(target=_loop, args=(interval_hours,), daemon=True)
@@ -1,13 +1,46 @@
+import asyncio
 import asyncpg
 import os
+import time
 import pandas as pd
 from datetime import datetime
 from utils import load_uid_map
 
+NEW_RECORD_COLUMNS = ["uid", "map_name", "login", "nickname", "time_s", "rank", "detected_at"]
+
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 5
+HEALTH_CHECK_SECONDS = 60  # pool check at most this often, not once per write
+BATCH_SIZE = 500           # flush the record buffer once it holds this many rows...
+FLUSH_SECONDS = 2.0        # ...and at least this often
+MAX_RETRIES = 5            # connection failures before a batch is dropped
+MAX_BUFFERED = 20000       # oldest rows are dropped beyond this many
+
+# Failures worth retrying: the server or the network, not the rows themselves
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError, asyncpg.PostgresConnectionError, asyncpg.InterfaceError)
+
+
+async def create_pool(dsn=None):
+    """
+    asyncpg pool for DATABASE_URL. Idle connections are recycled after 5 minutes
+    so the remote server dropping them does not surface as a failed write.
+    """
+    return await asyncpg.create_pool(
+        dsn or os.getenv("DATABASE_URL"),
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        max_inactive_connection_lifetime=300,
+    )
+
 
 async def init_db(bot):
-    bot.db = await asyncpg.connect(os.getenv("DATABASE_URL"))
-    
+    # bot.db is a pool: bot.db.execute/fetchrow borrow a connection per call
+    bot.db = await create_pool()
+    bot.db_checked_at = time.monotonic()
+    bot.record_writer = RecordWriter(bot.db)
+    bot.record_writer.start()
+    _close_with_bot(bot)
+
     # Create table if it doesn't exist
     await bot.db.execute("""
     CREATE TABLE IF NOT EXISTS new_records (
@@ -29,60 +62,194 @@ async def init_db(bot):
     # If empty, populate from records folder
     if total_records == 0:
         print("[DB] Populating initial records from CSVs...")
-        uid_to_name, key_to_uid = load_uid_map("maps_dict.txt")
-
-        folder = "records"
-        for filename in os.listdir(folder):
-            if filename.endswith(".csv"):
-                uid = filename.replace(".csv","")
-                path = os.path.join(folder, filename)
-                df = pd.read_csv(path).head(30)
-                df["Nickname"] = df["Nickname"].fillna("") # if empty pseudo, fills NA
-                for _, row in df.iterrows():
-                    
-                    map_name = uid_to_name.get(uid, uid)  # fallback to uid if not found
-                    
-                    await bot.db.execute("""
-                        INSERT INTO new_records(uid, map_name, login, nickname, time_s, rank, detected_at)
-                        VALUES($1,$2,$3,$4,$5,$6,$7)
-                    """,
-                    uid,  # store UID or map_name mapping if needed
-                    map_name,
-                    row["Login"],
-                    row["Nickname"],
-                    row["Time_s"],
-                    int(row["Rank"]),
-                    datetime.utcnow()
-                    )
-        print("[DB] Initial records inserted.")
-        
+        inserted = await bulk_load_records(bot.db)
+        print(f"[DB] Initial records inserted ({inserted} rows).")
+
     print(f"✅ Connected to database. Total stored records: {total_records}")
     return total_records
 
 
+def initial_records(folder="records", uid_map_path="maps_dict.txt", top_n=30):
+    """Top `top_n` rows of every records/<uid>.csv, as new_records tuples."""
+    uid_to_name, key_to_uid = load_uid_map(uid_map_path)
+    frames = []
+    for filename in os.listdir(folder):
+        if filename.endswith(".csv"):
+            df = pd.read_csv(os.path.join(folder, filename)).head(top_n)
+            df["uid"] = filename.replace(".csv", "")
+            frames.append(df)
+    if not frames:
+        return []
+
+    df = pd.concat(frames, ignore_index=True)
+    df = df.dropna(subset=["Rank"])
+    df["map_name"] = df["uid"].map(uid_to_name).fillna(df["uid"])  # fallback to uid if not found
+    df["Nickname"] = df["Nickname"].fillna("")  # if empty pseudo, fills NA
+    df["Login"] = df["Login"].astype(object).where(df["Login"].notna(), None)
+    df["Time_s"] = pd.to_numeric(df["Time_s"], errors="coerce").astype(object)
+    df["Time_s"] = df["Time_s"].where(df["Time_s"].notna(), None)
+    df["Rank"] = df["Rank"].astype(int)
+    df["detected_at"] = datetime.utcnow()
+    columns = ["uid", "map_name", "Login", "Nickname", "Time_s", "Rank", "detected_at"]
+    return list(df[columns].itertuples(index=False, name=None))
+
+
+async def bulk_load_records(pool, folder="records", uid_map_path="maps_dict.txt", top_n=30):
+    """Seed new_records from the records folder with a single COPY; returns the row count."""
+    records = initial_records(folder, uid_map_path, top_n)
+    if records:
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.copy_records_to_table("new_records", records=records, columns=NEW_RECORD_COLUMNS)
+    return len(records)
+
+
 async def ensure_db_connection(bot):
-    """Reconnect to DB only if the connection was lost."""
+    """
+    Check the pool at most every HEALTH_CHECK_SECONDS and rebuild it when it
+    is closed or cannot serve a query. Connections the server dropped are
+    replaced by the pool itself, so writes no longer ping first.
+    """
+    now = time.monotonic()
+    if now - getattr(bot, "db_checked_at", 0) < HEALTH_CHECK_SECONDS and not bot.db.is_closing():
+        return
+    bot.db_checked_at = now
     try:
         await bot.db.execute("SELECT 1;")
     except Exception:
-        print("[DB] Lost connection, reconnecting...")
-        bot.db = await asyncpg.connect(os.getenv("DATABASE_URL"))
+        print("[DB] Pool unhealthy, reconnecting...")
+        bot.db.terminate()
+        bot.db = await create_pool()
+        bot.record_writer.pool = bot.db
         print("[DB] Reconnected successfully.")
 
 
 async def save_new_record(bot, uid, map_name, login, nickname, time_s, rank):
-    """Insert a single new record safely."""
+    """Queue a new record; it is written with the next batch (see RecordWriter)."""
     await ensure_db_connection(bot)
-    await bot.db.execute(
-        """
-        INSERT INTO new_records (uid, map_name, login, nickname, time_s, rank, detected_at)
-        VALUES ($1, $2, $3, $4, $5, $6, $7)
-        """,
-        uid,
-        map_name,
-        login,
-        nickname,
-        time_s,
-        rank,
-        datetime.utcnow(),
-    )
\ No newline at end of file
+    await bot.record_writer.add(uid, map_name, login, nickname, time_s, rank)
+
+
+async def close_db(bot):
+    """Write the buffered records and close the pool."""
+    if bot.db.is_closing():
+        return
+    await bot.record_writer.close()
+    await bot.db.close()
+
+
+def _close_with_bot(bot):
+    """Run close_db before bot.close() (e.g. discord.py's shutdown), so buffered records are written."""
+    close = getattr(bot, "close", None)
+    if close is None or getattr(close, "closes_db", False):
+        return
+
+    async def close_and_flush(*args, **kwargs):
+        try:
+            await close_db(bot)
+        except Exception as e:
+            print(f"[DB] Failed to flush records on shutdown: {e}")
+        return await close(*args, **kwargs)
+
+    close_and_flush.closes_db = True
+    bot.close = close_and_flush
+
+
+class RecordWriter:
+    """
+    Buffers new records and writes them with one COPY per batch: as soon as
+    BATCH_SIZE rows are waiting, otherwise every FLUSH_SECONDS.
+    A batch that failed on the connection stays buffered for the next flush,
+    up to MAX_RETRIES times; one rejected by the server is written row by row
+    so only the offending rows are dropped.
+    """
+
+    def __init__(self, pool, batch_size=BATCH_SIZE, flush_seconds=FLUSH_SECONDS,
+                 max_retries=MAX_RETRIES, max_buffered=MAX_BUFFERED):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_retries = max_retries
+        self.max_buffered = max_buffered
+        self._rows = []
+        self._failures = 0
+        self._lock = asyncio.Lock()
+        self._task = None
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        """Start the periodic flush on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def add(self, uid, map_name, login, nickname, time_s, rank, detected_at=None):
+        self._rows.append((uid, map_name, login, nickname, time_s, rank, detected_at or datetime.utcnow()))
+        if len(self._rows) > self.max_buffered:
+            overflow = len(self._rows) - self.max_buffered
+            del self._rows[:overflow]
+            self.dropped += overflow
+            print(f"[DB] Record buffer full, dropped the {overflow} oldest records")
+        if len(self._rows) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        """Write every buffered row; returns how many were written."""
+        async with self._lock:
+            rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            try:
+                async with self.pool.acquire() as conn:
+                    await conn.copy_records_to_table("new_records", records=rows, columns=NEW_RECORD_COLUMNS)
+                written = len(rows)
+            except CONNECTION_ERRORS as e:
+                self._failures += 1
+                if self._failures > self.max_retries:
+                    print(f"[DB] Dropping {len(rows)} records after {self.max_retries} failed retries: {e}")
+                    self.dropped += len(rows)
+                    self._failures = 0
+                    return 0
+                print(f"[DB] Failed to write {len(rows)} records, keeping them for the next flush: {e}")
+                self._rows[:0] = rows
+                return 0
+            except asyncpg.PostgresError as e:
+                print(f"[DB] Batch of {len(rows)} records rejected ({e}), writing them one by one")
+                written = await self._write_rows(rows)
+            self._failures = 0
+            self.written += written
+            return written
+
+    async def _write_rows(self, rows):
+        """Insert `rows` one at a time, dropping (and logging) those the server rejects."""
+        placeholders = ", ".join(f"${i}" for i in range(1, len(NEW_RECORD_COLUMNS) + 1))
+        query = f"INSERT INTO new_records ({', '.join(NEW_RECORD_COLUMNS)}) VALUES ({placeholders})"
+        dropped_before = self.dropped
+        written = 0
+        try:
+            async with self.pool.acquire() as conn:
+                for row in rows:
+                    try:
+                        await conn.execute(query, *row)
+                    except asyncpg.PostgresError as e:
+                        self.dropped += 1
+                        print(f"[DB] Dropped record {row}: {e}")
+                    else:
+                        written += 1
+        except CONNECTION_ERRORS as e:
+            # Connection lost midway: rows not tried yet go back to the buffer
+            tried = written + self.dropped - dropped_before
+            print(f"[DB] Connection lost writing records one by one, keeping {len(rows) - tried}: {e}")
+            self._rows[:0] = rows[tried:]
+        return written
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
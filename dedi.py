@@ -1,11 +1,22 @@
+import asyncio
+import hashlib
+import aiohttp
 import requests
-from bs4 import BeautifulSoup
 import pandas as pd
+from urllib.parse import urlsplit
 from db import ensure_db_connection
+from dedi_parser import HEADER_FIELDS, extract_records_table, parse_records_table
+from schema import canonicalize
+from map_catalog import load_uid_list
 import sys
 import time
 
 UID_FILE = "./resources/all_maps.txt"
+DEDI_URL = "http://dedimania.net/tmstats/?do=stat&Mode=M1&Uid={uid}&Show=RECORDS"
+
+# Async crawl settings: simultaneous connections and request starts per second per host
+CONCURRENCY = 16
+RATE_PER_HOST = 3.0  # polite: a full crawl of the ~250 maps takes under 2 minutes
 
 headers = {
     "User-Agent": (
@@ -15,111 +26,214 @@ headers = {
     )
 }
 
-def fetch_dedi():
-    with open(UID_FILE, "r", encoding="utf-8") as f:
-        uids = [u.strip() for u in f if u.strip()]
-        uids = uids
+# Per-map state kept between crawls: HTTP validators + row digest, and the
+# typed record partition built from that page
+_fingerprints = {}
+_partitions = {}
+_merged = None
+
+_FAILED = object()
+
+def load_map_uids(path=UID_FILE):
+    # Re-read only when the file changed: the scheduler asks on every pass
+    return load_uid_list(path)
+
+def fetch_dedi(mode="async", concurrency=CONCURRENCY, rate=RATE_PER_HOST, force=False, uids=None):
+    """
+    Fetch the records of every map in UID_FILE and return them as one DataFrame.
+    Passing `uids` only requests those maps; the others keep their cached
+    partition in the returned frame.
+    mode="async" crawls all maps concurrently over one connection pool,
+    mode="sync" walks them one by one with blocking requests.
+
+    Maps whose page is unchanged since the previous call (HTTP 304, or the same
+    record rows digest) are not parsed again and keep their cached partition;
+    force=True drops the cache first. The returned frame carries the UIDs that
+    changed or failed in df.attrs["changed_uids"] / df.attrs["failed_uids"].
+    """
+    global _merged
+    if force:
+        _fingerprints.clear()
+        _partitions.clear()
+        _merged = None
+
+    all_uids = load_map_uids()
+    uids = all_uids if uids is None else list(uids)
+    print(f"Found {len(all_uids)} UIDs in {UID_FILE}, fetching {len(uids)}")
+
+    if mode == "sync":
+        pages = _crawl_sync(uids)
+    else:
+        pages = asyncio.run(fetch_dedi_async(uids, concurrency=concurrency, rate=rate))
+
+    changed = [(uid, page) for uid, page in pages if page is not None]
+    failed = sorted(set(uids) - {uid for uid, _ in pages})
+    print(f"✅ {len(changed)} maps changed, {len(pages) - len(changed)} unchanged, {len(failed)} failed")
+
+    if changed:
+        _update_partitions(changed)
+    removed = set(_partitions) - set(all_uids)
+    for uid in removed:
+        del _partitions[uid]
+        _fingerprints.pop(uid, None)
+
+    # Only re-merge when a partition was rebuilt or dropped
+    if changed or removed or _merged is None:
+        frames = [_partitions[uid] for uid in all_uids if uid in _partitions]
+        _merged = pd.concat(frames, ignore_index=True) if frames else records_to_dataframe([])
+        _merged = canonicalize(_merged)
+
+    sys.stdout.flush()
+    df = _merged.copy(deep=False)
+    df.attrs["changed_uids"] = sorted({uid for uid, _ in changed} | removed)
+    df.attrs["failed_uids"] = failed
+    return df
+
+def _update_partitions(changed):
+    """Build typed partitions for the changed (uid, (columns, fingerprint)) pages."""
+    frame = records_to_dataframe([(uid, columns) for uid, (columns, _) in changed])
+    parts = dict(tuple(frame.groupby("MapUID", sort=False)))
+    for uid, (_, fingerprint) in changed:
+        part = parts.get(uid, frame.iloc[0:0])
+        _partitions[uid] = part.reset_index(drop=True)
+        _fingerprints[uid] = fingerprint
+
+def _conditional_headers(uid):
+    fingerprint = _fingerprints.get(uid) if uid in _partitions else None
+    if not fingerprint:
+        return {}
+    conditional = {}
+    if fingerprint["etag"]:
+        conditional["If-None-Match"] = fingerprint["etag"]
+    if fingerprint["last_modified"]:
+        conditional["If-Modified-Since"] = fingerprint["last_modified"]
+    return conditional
+
+def _read_page(uid, status, resp_headers, text):
+    """
+    Return (columns, fingerprint) for a page whose records changed, or None
+    when the cached partition of `uid` is still current.
+    """
+    if status == 304 and uid in _partitions:
+        return None
+    table = extract_records_table(text)
+    fingerprint = {
+        "etag": resp_headers.get("ETag"),
+        "last_modified": resp_headers.get("Last-Modified"),
+        "digest": hashlib.blake2b(table.encode("utf-8"), digest_size=16).hexdigest(),
+    }
+    previous = _fingerprints.get(uid)
+    if uid in _partitions and previous and previous["digest"] == fingerprint["digest"]:
+        _fingerprints[uid] = fingerprint  # keep the freshest validators
+        return None
+    return _parse_logged(table, uid), fingerprint
+
+async def fetch_dedi_async(uids, concurrency=CONCURRENCY, rate=RATE_PER_HOST):
+    """
+    Crawl `uids` with at most `concurrency` requests in flight and at most
+    `rate` request starts per second per host. Returns (uid, page) pairs in
+    `uids` order, where page is (columns, fingerprint) or None if unchanged;
+    maps that failed to fetch are left out.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    throttles = {}
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=concurrency)
+    timeout = aiohttp.ClientTimeout(total=15)
+    results = [_FAILED] * len(uids)
+
+    async def fetch_one(n, uid, session):
+        url = DEDI_URL.format(uid=uid)
+        host = urlsplit(url).hostname
+        throttle = throttles.setdefault(host, _HostThrottle(rate))
+        # Wait for the host's turn before taking a slot, so waiting tasks hold no slot
+        await throttle.wait()
+        async with semaphore:
+            print(f"[{n + 1}/{len(uids)}] Fetching {url}")
+            try:
+                async with session.get(url, headers=_conditional_headers(uid)) as resp:
+                    resp.raise_for_status()
+                    text = await resp.text()
+            except Exception as e:
+                print(f"⚠️ Failed to fetch {uid}: {e}")
+                return
+        results[n] = _read_page(uid, resp.status, resp.headers, text)
 
-    all_records = []
-    print(f"Found {len(uids)} UIDs in {UID_FILE}")
+    async with aiohttp.ClientSession(headers=headers, connector=connector, timeout=timeout) as session:
+        await asyncio.gather(*(fetch_one(n, uid, session) for n, uid in enumerate(uids)))
 
+    # Keep the UID_FILE order so the frame matches the sequential crawl
+    return [(uid, page) for uid, page in zip(uids, results) if page is not _FAILED]
+
+def _crawl_sync(uids):
+    pages = []
     for n, uid in enumerate(uids, start=1):
-        url = f"http://dedimania.net/tmstats/?do=stat&Mode=M1&Uid={uid}&Show=RECORDS"
+        url = DEDI_URL.format(uid=uid)
         print(f"[{n}/{len(uids)}] Fetching {url}")
 
         try:
-            resp = requests.get(url, headers=headers, timeout=15)
+            resp = requests.get(url, headers={**headers, **_conditional_headers(uid)}, timeout=15)
             resp.raise_for_status()
         except Exception as e:
             print(f"⚠️ Failed to fetch {uid}: {e}")
             continue
 
-        # Extract clean text
-        soup = BeautifulSoup(resp.text, "html.parser")
-        lines = [line.strip() for line in soup.get_text("\n", strip=True).split("\n") if line.strip()]
-        lines = cutlines(lines)
-        # Each record starts with "TMU"
-        records = []
-        for i, line in enumerate(lines):
-            if line == "TMU" and i + 11 < len(lines):
-                block = lines[i : i + 12]  # TMU + next 11 lines
-                record = {
-                    "Game": block[0],
-                    "Login": block[1],
-                    "NickName": block[2],
-                    "Rank": block[3],
-                    "Max": block[4],
-                    "Record": block[5],
-                    "Mode": block[6],
-                    "CPs": block[7],
-                    "MapCPs": block[8],
-                    "Challenge": block[9],
-                    "Envir": block[10],
-                    "RecordDate": block[11],
-                    "MapUID": uid,
-                }
-                records.append(record)
-
-        if not records:
-            print(f"⚠️ No records found for {uid}")
-        else:
-            all_records.extend(records)
-            print(f"✅ Parsed {len(records)} records for {uid}")
-        
-    sys.stdout.flush()
-    time.sleep(2)
-    # Combine everything into a DataFrame
+        pages.append((uid, _read_page(uid, resp.status_code, resp.headers, resp.text)))
+    return pages
+
+class _HostThrottle:
+    """Space request starts to one every 1/rate seconds (rate=0 disables it)."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+def _parse_logged(table, uid):
+    columns = parse_records_table(table)
+    n = len(columns["Game"])
+    if not n:
+        print(f"⚠️ No records found for {uid}")
+    else:
+        print(f"✅ Parsed {n} records for {uid}")
+    return columns
+
+def records_to_dataframe(pages):
+    """Concatenate the (uid, columns) pages into one typed DataFrame."""
     print("✅ Loop finished, now converting to DataFrame…")
-    df = pd.DataFrame(all_records)
+    data = {field: [] for field in HEADER_FIELDS}
+    data["MapUID"] = []
+    for uid, columns in pages:
+        for field in HEADER_FIELDS:
+            data[field].extend(columns[field])
+        data["MapUID"].extend([uid] * len(columns["Game"]))
+    df = pd.DataFrame(data)
     print(f"✅ Created DataFrame with {len(df)} rows")
-    
-    sys.stdout.flush()
-    time.sleep(2)
-    
+
     print("🧮 Parsing numeric/time fields…")
-    df["Record"] = df["Record"].apply(parse_record_time)
+    df["Record"] = parse_record_times(df["Record"])
     df["Rank"] = pd.to_numeric(df["Rank"], errors="coerce")
     df["Max"] = pd.to_numeric(df["Max"], errors="coerce")
     df["CPs"] = pd.to_numeric(df["CPs"], errors="coerce")
     df["RecordDate"] = pd.to_datetime(df["RecordDate"], errors="coerce")
-    
-    sys.stdout.flush()
-    time.sleep(2)
+
     print("💾 Returning DataFrame…")
-    
     sys.stdout.flush()
-    time.sleep(2)
     return df
 
-def cutlines(lines):
-        # Define header block and length
-    header_fields = [
-        "Game", "Login", "NickName", "Rank", "Max",
-        "Record", "Mode", "CPs", "MapCPs", "Challenge",
-        "Envir", "RecordDate"
-    ]
-    
-    # Find where the header starts
-    start_idx = None
-    for i in range(len(lines) - len(header_fields)):
-        if lines[i:i+len(header_fields)] == header_fields:
-            start_idx = i + len(header_fields)
-            break
-    
-    # Find "Limit" at the end
-    end_idx = None
-    for i, line in enumerate(lines):
-        if line.strip().lower().startswith("limit"):
-            end_idx = i
-            break
-    
-    # Slice between header and "Limit"
-    if start_idx is not None and end_idx is not None:
-        data_lines = lines[start_idx:end_idx]
-    else:
-        data_lines = []
-        
-    return(data_lines)
+def parse_record_times(times):
+    """Vectorized parse_record_time: 'MM:SS.xx' strings to float seconds (NaN if malformed)."""
+    parts = times.str.split(":", n=1, expand=True).reindex(columns=[0, 1])
+    mins = pd.to_numeric(parts[0], errors="coerce")
+    secs = pd.to_numeric(parts[1], errors="coerce")
+    return (mins * 60 + secs).round(3)
 
 def parse_record_time(time_str):
     """Convert 'MM:SS.xx' to float seconds"""
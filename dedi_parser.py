@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Direct parser for the Dedimania tmstats RECORDS table.
+
+Instead of flattening the whole page to text and searching for the header,
+the stats table is located once and its rows are split cell by cell, so
+empty cells keep their position and a nickname reading "TMU" is just data.
+"""
+import re
+from html import unescape
+
+HEADER_FIELDS = (
+    "Game", "Login", "NickName", "Rank", "Max",
+    "Record", "Mode", "CPs", "MapCPs", "Challenge",
+    "Envir", "RecordDate",
+)
+
+# Header cells in order, with any tags/whitespace between them
+_HEADER_RE = re.compile(
+    r"(?:\s|<[^>]*>)*".join(re.escape(f) for f in HEADER_FIELDS),
+    re.IGNORECASE,
+)
+_TABLE_END_RE = re.compile(r"</table\s*>", re.IGNORECASE)
+_ROW_SPLIT_RE = re.compile(r"<tr\b[^>]*>", re.IGNORECASE)
+_CELL_SPLIT_RE = re.compile(r"<t[dh]\b[^>]*>", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]*>")
+
+
+def extract_records_table(html):
+    """
+    Return the slice of `html` holding the record rows (after the header row,
+    up to the end of the stats table), or "" if the page has no stats table.
+    """
+    header = _HEADER_RE.search(html)
+    if header is None:
+        return ""
+    # The first record row starts at the next <tr> after the header cells
+    first_row = _ROW_SPLIT_RE.search(html, header.end())
+    end = _TABLE_END_RE.search(html, header.end())
+    end = end.start() if end else len(html)
+    if first_row is None or first_row.start() >= end:
+        return ""
+    return html[first_row.start():end]
+
+
+def parse_records_table(table_html):
+    """
+    Split the rows of an extracted records table into column lists keyed by
+    HEADER_FIELDS. Rows that do not have exactly one cell per field are skipped.
+    """
+    columns = {field: [] for field in HEADER_FIELDS}
+    targets = [columns[field].append for field in HEADER_FIELDS]
+    n_fields = len(HEADER_FIELDS)
+
+    for row in _ROW_SPLIT_RE.split(table_html)[1:]:
+        cells = _CELL_SPLIT_RE.split(row)[1:]
+        if len(cells) != n_fields:
+            continue
+        for append, cell in zip(targets, cells):
+            if "<" in cell:
+                cell = _TAG_RE.sub("", cell)
+            if "&" in cell:
+                cell = unescape(cell)
+            append(cell.strip())
+    return columns
+
+
+def parse_records(html):
+    """Parse a whole Dedimania stats page into column lists."""
+    return parse_records_table(extract_records_table(html))
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Shape-preserving downsampling of chart series.
+
+Charts only need about one point per couple of pixels, so long series are
+reduced on the server before being embedded in the Vega spec:
+
+    lttb     Largest-Triangle-Three-Buckets: keeps the points that shape the
+             line (for cumulative series such as total points).
+    minmax   Lowest and highest point of every bucket: keeps every spike
+             (for noisy series such as daily deltas).
+
+Both keep original rows, never interpolated ones, so tooltips show exact
+values, and a series already within the budget is returned untouched.
+"""
+import numpy as np
+
+PIXELS_PER_POINT = 2
+MIN_POINTS = 20
+MAX_CHART_POINTS = 20000  # whole chart, all series together
+
+
+def point_budget(width_px, n_series=1, pixels_per_point=PIXELS_PER_POINT):
+    """Points worth drawing per series when `n_series` share a chart `width_px` wide."""
+    per_series = min(int(width_px) // pixels_per_point, MAX_CHART_POINTS // max(n_series, 1))
+    return max(MIN_POINTS, per_series)
+
+
+def lttb(x, y, threshold):
+    """Positions of the `threshold` points LTTB keeps out of (x, y)."""
+    return _lttb_many(np.asarray(x), np.asarray(y), np.array([0]), np.array([len(x)]), threshold)
+
+
+def _lttb_many(x, y, starts, stops, threshold):
+    """
+    LTTB over several series at once (positions starts[i]:stops[i] of x/y).
+    Buckets are visited in order, each one for every series in a single
+    vectorized step, since a bucket's pick depends on the previous one.
+    """
+    lengths = stops - starts
+    short = lengths <= threshold
+    kept = [np.arange(start, stop) for start, stop in zip(starts[short], stops[short])]
+    starts, lengths = starts[~short], lengths[~short]
+    if threshold < 3 or not len(starts):
+        kept += [np.arange(start, start + n) for start, n in zip(starts, lengths)]
+        return np.sort(np.concatenate(kept)) if kept else np.empty(0, dtype=np.int64)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+
+    # First and last points are kept; the others are split into threshold - 2 buckets
+    n_series, n_buckets = len(starts), threshold - 2
+    edges = 1 + np.arange(n_buckets + 1) * (lengths[:, None] - 2) // n_buckets  # (series, buckets + 1)
+    sizes = np.diff(edges, axis=1)
+    series = np.repeat(np.arange(n_series), lengths - 2)
+    positions = np.repeat(starts + 1, lengths - 2) + _ranges(lengths - 2)
+    bucket = np.repeat(np.tile(np.arange(n_buckets), n_series), sizes.ravel())
+
+    # Third vertex of every bucket: average of the next one (the last point for the last bucket)
+    flat = series * n_buckets + bucket
+    counts = np.bincount(flat, minlength=n_series * n_buckets).reshape(n_series, n_buckets)
+    mean_x = (np.bincount(flat, x[positions], n_series * n_buckets).reshape(n_series, n_buckets) / counts)
+    mean_y = (np.bincount(flat, y[positions], n_series * n_buckets).reshape(n_series, n_buckets) / counts)
+    last = starts + lengths - 1
+    next_x = np.column_stack([mean_x[:, 1:], x[last]])
+    next_y = np.column_stack([mean_y[:, 1:], y[last]])
+
+    # Points grouped by bucket, then by series
+    order = np.lexsort((series, bucket))
+    block_bounds = np.searchsorted(bucket[order], np.arange(n_buckets + 1))
+    picks = np.empty((n_series, threshold), dtype=np.int64)
+    picks[:, 0], picks[:, -1] = starts, last
+    previous = starts
+    for b in range(n_buckets):
+        block = order[block_bounds[b]:block_bounds[b + 1]]
+        sid, pos = series[block], positions[block]
+        px, py = x[previous][sid], y[previous][sid]
+        area = np.abs(
+            (px - next_x[sid, b]) * (y[pos] - py) - (px - x[pos]) * (next_y[sid, b] - py)
+        )
+        area = np.nan_to_num(area, nan=-1.0)
+        # First point of the largest triangle, per series
+        seg = np.r_[0, np.cumsum(sizes[:, b])[:-1]]
+        best = np.repeat(np.maximum.reduceat(area, seg), sizes[:, b])
+        first = np.flatnonzero(area == best)
+        previous = pos[first[np.searchsorted(first, seg)]]
+        picks[:, b + 1] = previous
+    kept.append(picks.ravel())
+    return np.sort(np.concatenate(kept))
+
+
+def _ranges(lengths):
+    """Concatenation of arange(n) for every n of `lengths`."""
+    total = lengths.sum()
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.arange(total) - offsets
+
+
+def minmax(x, y, threshold):
+    """Positions of the lowest and highest point of threshold // 2 buckets, plus both ends."""
+    n = len(x)
+    if threshold >= n or threshold < 4:
+        return np.arange(n)
+    y = np.asarray(y, dtype="float64")
+    buckets = threshold // 2
+    bucket = np.arange(n) * buckets // n
+    order = np.lexsort((np.nan_to_num(y, nan=np.inf), bucket))
+    bounds = np.searchsorted(bucket[order], np.arange(buckets + 1))
+    lowest = order[bounds[:-1]]
+    highest = order[bounds[1:] - 1]
+    return np.unique(np.concatenate([[0, n - 1], lowest, highest]))
+
+
+def downsample(df, x, y, by, threshold, method="lttb"):
+    """
+    Rows of `df` kept when every `by` series (contiguous and ordered by `x`,
+    as SeriesIndex.select returns them) is reduced to about `threshold` points.
+    """
+    if df.empty:
+        return df
+    keys = df[by].to_numpy()
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    stops = np.r_[starts[1:], len(df)]
+    xs = df[x].to_numpy()
+    if np.issubdtype(xs.dtype, np.datetime64):
+        xs = xs.astype("int64")
+    ys = df[y].to_numpy()
+    if method == "lttb":
+        return df.iloc[_lttb_many(xs, ys, starts, stops, threshold)]
+    rows = [start + minmax(xs[start:stop], ys[start:stop], threshold) for start, stop in zip(starts, stops)]
+    return df.iloc[np.concatenate(rows)]
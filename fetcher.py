@@ -4,92 +4,303 @@ Created on Tue Oct  7 18:58:54 2025
 
 @author: Hola
 """
+import io
 import os
 import threading
+from contextlib import contextmanager
 import time
 import sys
 from dotenv import load_dotenv
 load_dotenv()  # must come first
 import pandas as pd
-from datetime import datetime
-from dedi import fetch_dedi  
+from datetime import datetime, timedelta
+from dedi import fetch_dedi, load_map_uids
+from scheduler import RefreshScheduler
+from store import write_snapshot
+from history import HistoryLog
+from snapshot import SnapshotHolder
+from panels import TEAMS_PATH, materialize, team_lookup
+from aggregates import LeaderboardAggregator
 import psycopg2
 from datetime import date
 
 
-from score import assign_points
-from psycopg2.extras import execute_values
+from score import daily_scores
+from psycopg2.pool import ThreadedConnectionPool
     
 
-latest_df = None
-last_updated = None
+# Latest records, shared read-only with every Streamlit session
+snapshots = SnapshotHolder()
+_fetched_df = None  # last fetched frame as returned by fetch_dedi
+_last_daily_store = None  # last day stored in player_daily_scores
+_db_pool = None
+_daily_table_ready = False
+_daily_store_failed_at = None  # monotonic time of the last failed daily store
+DAILY_BACKFILL_DAYS = 7  # missed days recovered from the history log
+DAILY_RETRY_SECONDS = 300  # wait after a failed daily store before trying again
+history_log = HistoryLog()
 
 
-def background_fetch_loop(interval=3600):
-    """Run fetch_dedi() every `interval` seconds (default = 1h)."""
-    global latest_df, last_updated
-    print("test")
-    while True:
-        print("⏳ Running scheduled Dedimania fetch...")
-        try:
-            df = fetch_dedi()
+def _teams_stamp(path=TEAMS_PATH):
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+
+leaderboard = LeaderboardAggregator(team_of=team_lookup())  # running solo/team totals
+_leaderboard_teams = _teams_stamp()  # teams.csv version the leaderboard was built with
+publish_hooks = []  # called with every new Snapshot (e.g. worker.py's shared file)
+
+
+def background_fetch_loop(budget_per_hour=None):
+    """
+    Keep the records fresh with a RefreshScheduler: every map gets its own
+    deadline, hot maps are refreshed more often than cold ones, and the total
+    stays within `budget_per_hour` requests (default: one per map and hour).
+    """
+    print("⏳ Starting Dedimania refresh scheduler...")
+    scheduler = RefreshScheduler(
+        fetch=lambda uids: fetch_dedi(uids=uids),
+        load_uids=load_map_uids,
+        on_snapshot=publish_snapshot,
+        budget_per_hour=budget_per_hour,
+    )
+    scheduler.run()
 
-            latest_df = df
 
-            last_updated = datetime.utcnow()
+def publish_snapshot(df):
+    """Expose a freshly fetched frame to the app and persist it."""
+    # Nothing to publish when no map changed since the last fetched snapshot,
+    # except on a new day: panels with a date window ("last 7 days") move on
+    current = snapshots.current()
+    new_day = current is not None and current.published_at.date() != datetime.utcnow().date()
+    teams_changed = _refresh_teams()
+    if _fetched_df is None or df.attrs.get("changed_uids") or new_day or teams_changed:
+        _publish_changed(df)
+
+    global _daily_store_failed_at
+    failed_at = _daily_store_failed_at
+    if failed_at is not None and time.monotonic() - failed_at < DAILY_RETRY_SECONDS:
+        return
+    try:
+        store_due_daily_scores(datetime.utcnow())
+        _daily_store_failed_at = None
+    except Exception as e:
+        _daily_store_failed_at = time.monotonic()
+        print(f"⚠️ Error storing daily scores (next try in {DAILY_RETRY_SECONDS // 60} min): {e}")
+
+
+def _refresh_teams():
+    """
+    Rebuild the leaderboard with the current teams.csv when it changed since
+    (its next update then recomputes every map); returns whether it did.
+    """
+    global leaderboard, _leaderboard_teams
+    stamp = _teams_stamp()
+    if stamp == _leaderboard_teams:
+        return False
+    _leaderboard_teams = stamp
+    try:
+        team_of = team_lookup()
+    except Exception as e:
+        print(f"⚠️ Error reloading teams: {e}")
+        return False
+    leaderboard = LeaderboardAggregator(team_of=team_of)
+    print(f"👥 Teams changed, recomputing team totals ({len(team_of)} players)")
+    return True
+
 
-            df.to_csv("./resources/dedimania_all_records.csv", index=False, encoding="utf-8")
-            print(f"✅ Data refreshed — {len(df)} records @ {last_updated}")
-            sys.stdout.flush()
+def _publish_changed(df):
+    global _fetched_df
 
+    # Before the first fetch, let the history log rebuild the previous state
+    previous_df = _fetched_df
+    _fetched_df = df
+    frame, panels = materialize(df, leaderboard=leaderboard)
+    snapshot = snapshots.publish(frame, fetched_at=datetime.utcnow(), panels=panels)
+    for hook in publish_hooks:
+        try:
+            hook(snapshot)
         except Exception as e:
-            print(f"⚠️ Error during fetch: {e}")
-        
-        if datetime.utcnow().hour == 0:
-            print("⚠️ Storing to remote Neon db")
-            store_daily_scores(df)
-            sys.stdout.flush() # Ensure printing
-        
-        time.sleep(interval)  # wait for next refresh
-        
+            print(f"⚠️ Error publishing snapshot v{snapshot.version}: {e}")
+
+    write_snapshot(df)
+    try:
+        n_events = history_log.append(
+            previous_df, df, observed_at=snapshot.fetched_at, uids=df.attrs.get("changed_uids")
+        )
+        print(f"📜 Logged {n_events} record changes")
+    except Exception as e:
+        print(f"⚠️ Error appending record history: {e}")
+    print(f"✅ Data refreshed — {len(df)} records @ {snapshot.fetched_at} (v{snapshot.version})")
+    sys.stdout.flush()
 
 
 # Launch the background thread (only once)
 def start_background_thread():
     if not any(t.name == "dedimania_fetcher" for t in threading.enumerate()):
-        t = threading.Thread(target=background_fetch_loop, args=(3600,), daemon=True, name="dedimania_fetcher")
+        t = threading.Thread(target=background_fetch_loop, daemon=True, name="dedimania_fetcher")
         t.start()
         print("🚀 Background fetch thread started.")
 
-def store_daily_scores(df):
+def db_pool():
+    """psycopg2 pool shared by the fetch thread's database writes."""
+    global _db_pool
+    if _db_pool is None or _db_pool.closed:
+        db_url = os.getenv("DATABASE_URL")
+        if not db_url:
+            raise ValueError("DATABASE_URL not found!")
+        _db_pool = ThreadedConnectionPool(1, 2, db_url)
+    return _db_pool
+
+
+@contextmanager
+def pooled_connection():
     """
-    Efficiently store daily player scores into the DB.
-    df must contain: Login, NickName, Rank, optional Team.
+    Connection borrowed from db_pool(), checked with SELECT 1 first: an idle
+    connection the server dropped (Neon suspends them) is closed and replaced
+    once by a fresh one.
     """
+    pool = db_pool()
+    conn = pool.getconn()
+    if not _connection_alive(conn):
+        pool.putconn(conn, close=True)
+        conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        pool.putconn(conn, close=bool(conn.closed))
+
+
+def _connection_alive(conn):
+    if conn.closed:
+        return False
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1;")
+        conn.rollback()  # end the transaction the check opened
+        return True
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+
+def store_due_daily_scores(now):
+    """
+    Store today's scores once per (UTC) day, on the first snapshot of the day,
+    and backfill up to DAILY_BACKFILL_DAYS days missed while nothing ran from
+    the record history, in the same transaction.
+    """
+    global _last_daily_store
+    today = now.date()
+    if _last_daily_store is None:
+        _last_daily_store = last_stored_day()
+    if _last_daily_store == today:
+        return
+
+    first_missed = today - timedelta(days=DAILY_BACKFILL_DAYS)
+    if _last_daily_store is not None:
+        first_missed = max(first_missed, _last_daily_store + timedelta(days=1))
+    backfill = None
+    if first_missed < today:
+        # Scores at the start of every missed day
+        backfill = history_log.score_history(
+            datetime.combine(first_missed, datetime.min.time()),
+            datetime.combine(today - timedelta(days=1), datetime.min.time()),
+        )
+
+    print("⚠️ Storing to remote Neon db")
+    store_daily_scores(snapshots.current().frame, day=today, backfill=backfill)
+    _last_daily_store = today
+    sys.stdout.flush() # Ensure printing
+
+
+def last_stored_day():
+    """Latest recorded_at in player_daily_scores, or None."""
+    global _daily_table_ready
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            _ensure_daily_table(cur)
+            cur.execute("SELECT max(recorded_at) FROM player_daily_scores;")
+            day = cur.fetchone()[0]
+        conn.commit()
+    _daily_table_ready = True
+    return day
+
+
+def store_daily_scores(df, day=None, backfill=None):
+    """
+    Store daily player scores into the DB.
+    df must contain: Login, NickName, Rank, RecordDate. Its scores are stored
+    for `day` (default today) together with the rows of `backfill` (login,
+    nickname, score, recorded_at; e.g. HistoryLog.score_history for missed
+    days), in one transaction: COPY into a staging table, then one upsert.
+    """
+    global _daily_table_ready
     print("⚙️ Starting fast bulk upload...")
+    timings = {}
+    started = time.perf_counter()
 
-    load_dotenv()
-    db_url = os.getenv("DATABASE_URL")
-    if not db_url:
-        raise ValueError("DATABASE_URL not found!")
+    day = day or date.today()
+    rows = daily_scores(df).assign(recorded_at=day)
+    if backfill is not None and not backfill.empty:
+        backfill = backfill.assign(recorded_at=pd.to_datetime(backfill["recorded_at"]).dt.date)
+        backfill = backfill[backfill["recorded_at"] != day]
+        rows = pd.concat([backfill[rows.columns], rows], ignore_index=True)
+    buffer = io.StringIO()
+    rows[["login", "nickname", "score", "recorded_at"]].to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    timings["prepare"] = time.perf_counter() - started
 
-    conn = psycopg2.connect(db_url)
-    cur = conn.cursor()
-    # Compute score
-    df["Score"] = df["Rank"].apply(assign_points)
-    
-    df = (
-    df.sort_values("RecordDate")
-      .groupby("Login", as_index=False)
-      .agg({
-          "NickName": "last",
-          "Score": "sum"  # or 'sum', depending on your scoring model
-      })
-)
-
-    today = date.today()
-
-    # Ensure table exists
+    with pooled_connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                _ensure_daily_table(cur)
+                cur.execute("""
+                    CREATE TEMP TABLE IF NOT EXISTS daily_scores_staging (
+                        login TEXT, nickname TEXT, score FLOAT, recorded_at DATE
+                    ) ON COMMIT DELETE ROWS;
+                """)
+
+                print(f"🚀 Inserting {len(rows)} records in bulk...")
+                stage = time.perf_counter()
+                cur.copy_expert(
+                    "COPY daily_scores_staging (login, nickname, score, recorded_at) FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+                timings["copy"] = time.perf_counter() - stage
+
+                stage = time.perf_counter()
+                cur.execute("""
+                    INSERT INTO player_daily_scores (login, nickname, score, recorded_at)
+                    SELECT login, nickname, score, recorded_at FROM daily_scores_staging
+                    ON CONFLICT (login, recorded_at)
+                    DO UPDATE SET
+                        score = EXCLUDED.score,
+                        nickname = EXCLUDED.nickname;
+                """)
+                timings["merge"] = time.perf_counter() - stage
+
+            stage = time.perf_counter()
+            conn.commit()
+            timings["commit"] = time.perf_counter() - stage
+            _daily_table_ready = True
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+
+    days = rows["recorded_at"].nunique()
+    stages = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items())
+    print(f"✅ Bulk insert complete — {len(rows)} rows uploaded for {days} day(s) up to {day} ({stages})")
+    return timings
+
+
+def _ensure_daily_table(cur):
+    """
+    Create player_daily_scores on first use in this process. Callers set
+    _daily_table_ready once their transaction committed, so a rolled back
+    CREATE is issued again next time.
+    """
+    if _daily_table_ready:
+        return
     cur.execute("""
         CREATE TABLE IF NOT EXISTS player_daily_scores (
             id SERIAL PRIMARY KEY,
@@ -100,36 +311,3 @@ def store_daily_scores(df):
             UNIQUE (login, recorded_at)
         );
     """)
-    conn.commit()
-
-    # Build list of tuples
-    records = [
-        (
-            str(row.Login),
-            str(row.NickName),
-            float(row.Score),
-            today,
-        )
-        for row in df.itertuples(index=False)
-    ]
-    
-    
-
-    print(f"🚀 Inserting {len(records)} records in bulk...")
-
-    # Faster ON CONFLICT bulk upsert
-    query = """
-        INSERT INTO player_daily_scores (login, nickname, score, recorded_at)
-        VALUES %s
-        ON CONFLICT (login, recorded_at)
-        DO UPDATE SET
-            score = EXCLUDED.score,
-            nickname = EXCLUDED.nickname;
-    """
-
-    execute_values(cur, query, records, page_size=500)
-    conn.commit()
-    cur.close()
-    conn.close()
-
-    print(f"✅ Bulk insert complete — {len(records)} rows uploaded for {today}")
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Column formatting shared by every renderer.
+
+Each helper takes a whole column and returns one label per row, computed
+with array arithmetic (integer buckets, numpy string ufuncs) instead of a
+Python call per cell.
+"""
+from datetime import datetime, timezone
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# "x ago" buckets: (upper bound in seconds, divisor, unit suffix)
+_AGO_BUCKETS = [
+    (60, 1, " s ago"),
+    (3600, 60, " min ago"),
+    (86400, 3600, " h ago"),
+]
+_DAY = 86400
+
+# Medal/ladder category of a rank (see rank_categories)
+RANK_CATEGORIES = ["Gold", "Silver", "Bronze", "Top 10", "Top 20", "Top 30", "Other", "Not Completed"]
+_RANK_BOUNDS = [1, 2, 3, 10, 20, 30]
+
+
+def time_ago_labels(dates, now=None, missing="N/A"):
+    """
+    "x s/min/h/day(s) ago" for every timestamp of `dates`. Naive timestamps
+    are taken as UTC; missing ones get `missing`.
+    """
+    dates = pd.to_datetime(pd.Series(dates), errors="coerce")
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+    now = pd.Timestamp(now if now is not None else datetime.now(timezone.utc))
+    if now.tzinfo is not None:
+        now = now.tz_convert("UTC").tz_localize(None)
+
+    stamps = dates.to_numpy("datetime64[ns]").astype(np.int64)
+    is_missing = dates.isna().to_numpy()
+    seconds = (now.value - stamps) / 1e9
+
+    # Bucket of every row, then whole units in that bucket (truncated like int())
+    bounds = np.array([b for b, _, _ in _AGO_BUCKETS])
+    bucket = np.searchsorted(bounds, seconds, side="right")
+    divisors = np.array([d for _, d, _ in _AGO_BUCKETS] + [_DAY])
+    units = np.fix(seconds / divisors[bucket]).astype(np.int64)
+
+    suffixes = np.array([s for _, _, s in _AGO_BUCKETS] + [" days ago"], dtype=object)[bucket]
+    suffixes[(bucket == len(_AGO_BUCKETS)) & (units <= 1)] = " day ago"
+    labels = _int_labels(units) + suffixes
+    labels[is_missing] = missing
+    return labels
+
+
+def time_ago(dt, missing="N/A"):
+    """time_ago_labels for a single timestamp."""
+    if dt is None or pd.isna(dt):
+        return missing
+    return time_ago_labels([dt], missing=missing)[0]
+
+
+def text_labels(values):
+    """Cells of a column, printed as f"{value}" would."""
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Format each category once
+        labels = np.append(values.cat.categories.astype(str).to_numpy(object), "nan")
+        return labels[values.cat.codes.to_numpy()]
+    if pd.api.types.is_integer_dtype(values.dtype):
+        return _int_labels(values.to_numpy())
+    return values.astype(str).to_numpy(object)
+
+
+def fixed_labels(values, digits=2, missing="nan"):
+    """Numbers with `digits` decimals, as f"{value:.2f}" prints them, via integer arithmetic."""
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy("float64")
+    is_missing = ~np.isfinite(values)
+    scale = 10 ** digits
+    product = np.abs(np.where(is_missing, 0, values)) * scale
+    scaled = np.rint(product).astype(np.int64)
+    labels = _int_labels(scaled // scale)
+    if digits:
+        labels = labels + _fractions(digits)[scaled % scale]
+    negative = np.signbit(values) & ~is_missing
+    labels[negative] = "-" + labels[negative]
+    # Halfway after scaling: the binary value decides, as in format()
+    for i in np.flatnonzero(product - np.floor(product) == 0.5):
+        labels[i] = f"{values[i]:.{digits}f}"
+    labels[is_missing] = missing
+    return labels
+
+
+def rank_labels(values, missing=""):
+    """Ranks as whole numbers ("3", not "3.0")."""
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy("float64")
+    is_missing = np.isnan(values)
+    labels = _int_labels(np.where(is_missing, 0, values).astype(np.int64))
+    labels[is_missing] = missing
+    return labels
+
+
+def _int_labels(ints):
+    """str() of every integer; each distinct value is converted once."""
+    uniques, inverse = np.unique(ints, return_inverse=True)
+    return uniques.astype(str).astype(object)[inverse.reshape(-1)]
+
+
+@lru_cache(maxsize=8)
+def _fractions(digits):
+    """".00" to ".99" (for 2 digits), indexed by the fractional part."""
+    return np.array([f".{i:0{digits}d}" for i in range(10 ** digits)], dtype=object)
+
+
+def rank_categories(values):
+    """RANK_CATEGORIES label of every rank, as a Categorical."""
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy("float64")
+    codes = np.searchsorted(_RANK_BOUNDS, values, side="left")
+    codes[np.isnan(values)] = len(RANK_CATEGORIES) - 1
+    return pd.Categorical.from_codes(codes, categories=RANK_CATEGORIES)
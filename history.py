@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Append-only history of record changes.
+
+Each published snapshot is compared with the previous one and only the rows
+that differ are appended, keyed by (MapUID, Login):
+    new      - the player entered the map's list
+    update   - any field of the player's row changed (improvement, rank drop...)
+    removed  - the player was pushed out of the list
+
+Events are stored as Parquet files partitioned by day. Full snapshots are
+checkpointed periodically, so the state at any timestamp is the latest
+checkpoint before it plus the events since, not a replay of everything.
+"""
+import os
+from datetime import datetime, timedelta
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from score import daily_scores, scoring_function
+
+HISTORY_DIR = "./resources/history"
+KEY = ["MapUID", "Login"]
+
+_TS_FORMAT = "%Y%m%dT%H%M%S%f"
+
+
+def diff_snapshots(prev, new, observed_at, uids=None):
+    """
+    Return the event rows turning `prev` into `new`. Restricting `uids` to the
+    maps that were re-fetched keeps the diff proportional to the churn.
+    """
+    if uids is not None:
+        uids = list(uids)
+        prev = prev[prev["MapUID"].isin(uids)]
+        new = new[new["MapUID"].isin(uids)]
+    # Compare plain values: categoricals of two snapshots have different categories
+    prev = _plain(prev.drop_duplicates(KEY))
+    new = _plain(new.drop_duplicates(KEY))
+    fields = [c for c in new.columns if c not in KEY]
+
+    merged = new.merge(prev[KEY + fields], on=KEY, how="outer", suffixes=("", "_prev"), indicator=True)
+    is_new = merged["_merge"] == "left_only"
+    is_removed = merged["_merge"] == "right_only"
+
+    differs = pd.Series(False, index=merged.index)
+    for col in fields:
+        a, b = merged[col], merged[f"{col}_prev"]
+        differs |= ~((a == b) | (a.isna() & b.isna()))
+    is_update = (merged["_merge"] == "both") & differs
+
+    events = merged[is_new | is_removed | is_update].copy()
+    # Removed rows keep their last known values for reference
+    removed = is_removed[events.index]
+    for col in fields:
+        events.loc[removed, col] = events.loc[removed, f"{col}_prev"]
+    events["Event"] = "update"
+    events.loc[is_new[events.index], "Event"] = "new"
+    events.loc[removed, "Event"] = "removed"
+    events["ObservedAt"] = pd.Timestamp(observed_at)
+    return events[KEY + fields + ["Event", "ObservedAt"]].reset_index(drop=True)
+
+
+def _with_unfetched(new, prev, fetched):
+    """Rows of `new` for the `fetched` maps plus the rows of `prev` for every other map."""
+    kept = prev[~prev["MapUID"].isin(list(fetched))]
+    if kept.empty:
+        return new
+    return pd.concat([_plain(new[new["MapUID"].isin(list(fetched))]), _plain(kept)], ignore_index=True)
+
+
+def _plain(df):
+    categorical = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    return df.astype({c: object for c in categorical})
+
+
+class HistoryLog:
+    """
+    Day-partitioned event log plus checkpoints under `root`:
+        root/events/date=YYYY-MM-DD/part-<ts>.parquet
+        root/checkpoints/<ts>.parquet
+    """
+
+    def __init__(self, root=HISTORY_DIR, checkpoint_every=timedelta(days=1)):
+        self.root = root
+        self.events_dir = os.path.join(root, "events")
+        self.checkpoints_dir = os.path.join(root, "checkpoints")
+        self.checkpoint_every = checkpoint_every
+
+    # ---------------------------
+    # Writing
+    # ---------------------------
+    def append(self, prev, new, observed_at=None, uids=None):
+        """
+        Log the changes between the `prev` and `new` snapshots. With no `prev`
+        (e.g. after a restart) the previous state is rebuilt from the log and
+        only the maps `new` was fetched for are compared: the others (failed,
+        listed in new.attrs["failed_uids"], or not crawled yet) are unknown,
+        not removed, and keep their logged rows in the next checkpoint.
+        Returns the number of events written.
+        """
+        observed_at = observed_at or datetime.utcnow()
+        failed = set(new.attrs.get("failed_uids", ()))
+        last_checkpoint = self.last_checkpoint()
+        if last_checkpoint is None:
+            # A partial first crawl would become the baseline: wait for a complete one
+            if not failed:
+                self.write_checkpoint(new, observed_at)
+            return 0
+        present = set(new["MapUID"].unique())
+        rebuilt = prev is None
+        if rebuilt:
+            prev = self.as_of(observed_at)
+            present -= failed
+            uids = present if uids is None else set(uids) & present
+
+        events = diff_snapshots(prev, new, observed_at, uids=uids)
+        if not events.empty:
+            day_dir = os.path.join(self.events_dir, f"date={observed_at:%Y-%m-%d}")
+            os.makedirs(day_dir, exist_ok=True)
+            _write_atomic(events, os.path.join(day_dir, f"part-{observed_at:{_TS_FORMAT}}.parquet"))
+
+        if observed_at - last_checkpoint >= self.checkpoint_every:
+            # Maps `new` lacks keep their logged rows: all unfetched ones after a
+            # restart, otherwise failed maps never fetched since the restart
+            lost = failed - present
+            unknown = prev if rebuilt else self.as_of(observed_at, uids=lost) if lost else None
+            self.write_checkpoint(new if unknown is None else _with_unfetched(new, unknown, present), observed_at)
+        return len(events)
+
+    def write_checkpoint(self, df, observed_at):
+        os.makedirs(self.checkpoints_dir, exist_ok=True)
+        _write_atomic(df, os.path.join(self.checkpoints_dir, f"{observed_at:{_TS_FORMAT}}.parquet"))
+
+    # ---------------------------
+    # Reading
+    # ---------------------------
+    def checkpoints(self):
+        if not os.path.isdir(self.checkpoints_dir):
+            return []
+        return sorted(
+            datetime.strptime(name[:-len(".parquet")], _TS_FORMAT)
+            for name in os.listdir(self.checkpoints_dir)
+            if name.endswith(".parquet")
+        )
+
+    def last_checkpoint(self, before=None):
+        stamps = [ts for ts in self.checkpoints() if before is None or ts <= before]
+        return stamps[-1] if stamps else None
+
+    def events(self, start, end, uids=None):
+        """Events observed in (start, end], optionally only for some maps."""
+        frames = []
+        day = start.date()
+        while day <= end.date():
+            day_dir = os.path.join(self.events_dir, f"date={day:%Y-%m-%d}")
+            if os.path.isdir(day_dir):
+                for name in sorted(os.listdir(day_dir)):
+                    if name.endswith(".parquet"):
+                        frames.append(_read(os.path.join(day_dir, name), uids))
+            day += timedelta(days=1)
+        if not frames:
+            return pd.DataFrame(columns=KEY + ["Event", "ObservedAt"])
+        events = pd.concat(frames, ignore_index=True)
+        in_range = (events["ObservedAt"] > start) & (events["ObservedAt"] <= end)
+        return events[in_range].sort_values("ObservedAt", kind="stable")
+
+    def as_of(self, ts, uids=None):
+        """Records as they were at `ts` (all maps, or only `uids`)."""
+        checkpoint = self.last_checkpoint(before=ts)
+        if checkpoint is None:
+            return pd.DataFrame(columns=KEY)
+        path = os.path.join(self.checkpoints_dir, f"{checkpoint:{_TS_FORMAT}}.parquet")
+        state = _read(path, uids)
+        return apply_events(state, self.events(checkpoint, ts, uids))
+
+    def map_top(self, uid, ts, n=30):
+        """Top `n` of one map as of `ts`."""
+        top = self.as_of(ts, uids=[uid])
+        if top.empty:
+            return top
+        return top.sort_values("Rank").head(n).reset_index(drop=True)
+
+    def leaderboard_as_of(self, ts):
+        return scoring_function(self.as_of(ts))
+
+    def score_history(self, start, end, freq="D", logins=None):
+        """
+        Total points per player sampled every `freq` between `start` and `end`,
+        in the layout of player_daily_scores (login, nickname, score, recorded_at).
+        Walks forward from one as_of() by applying each interval's events.
+        """
+        samples = pd.date_range(start, end, freq=freq)
+        if samples.empty:
+            return pd.DataFrame(columns=["login", "nickname", "score", "recorded_at"])
+        state = self.as_of(samples[0].to_pydatetime())
+        frames = []
+        for n, ts in enumerate(samples):
+            if n:
+                state = apply_events(state, self.events(samples[n - 1].to_pydatetime(), ts.to_pydatetime()))
+            scored = state if logins is None else state[state["Login"].isin(logins)]
+            if scored.empty:
+                continue
+            scores = daily_scores(scored)
+            scores["recorded_at"] = ts
+            frames.append(scores)
+        if not frames:
+            return pd.DataFrame(columns=["login", "nickname", "score", "recorded_at"])
+        return pd.concat(frames, ignore_index=True)
+
+
+def apply_events(state, events):
+    """Apply events (oldest first) to a snapshot; the last event per key wins."""
+    if events.empty:
+        return state.reset_index(drop=True)
+    last = events.drop_duplicates(KEY, keep="last")
+    touched = pd.MultiIndex.from_frame(last[KEY])
+    keep = ~pd.MultiIndex.from_frame(state[KEY]).isin(touched)
+    upserts = last[last["Event"] != "removed"].drop(columns=["Event", "ObservedAt"])
+    result = pd.concat([state[keep], upserts], ignore_index=True)
+    # Removed events carry NaNs that upcast ints; restore the snapshot dtypes
+    return result.astype(state.dtypes.to_dict(), errors="ignore")
+
+
+def _read(path, uids=None):
+    filters = [("MapUID", "in", list(uids))] if uids is not None else None
+    table = pq.read_table(path, filters=filters, memory_map=True, partitioning=None)
+    return table.to_pandas(coerce_temporal_nanoseconds=True)
+
+
+def _write_atomic(df, path):
+    tmp_path = f"{path}.tmp"
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Paginated, searchable solo leaderboard.
+
+RankIndex sorts the precomputed scores once per snapshot (best first) and
+keeps the row positions of every team, so a page is a slice of arrays and
+only the visible rows are ever formatted and sent to the browser.
+"""
+import numpy as np
+import pandas as pd
+from team_index import default_index, normalize_tag
+
+
+class RankIndex:
+    """
+    Args:
+        scores (pd.DataFrame): solo_leaderboard panel (Login, NickName, Points...).
+        team_index: TeamIndex used for the team filter (default: teams.csv + tags).
+    """
+
+    def __init__(self, scores, team_index=None):
+        team_index = team_index or default_index()
+        ranked = scores.sort_values(["Points", "Login"], ascending=[False, True], kind="stable")
+        ranked = ranked.reset_index(drop=True)
+        ranked.insert(0, "Position", ranked["Points"].rank(method="min", ascending=False).astype("int64"))
+        resolved = team_index.resolve(ranked["Login"], ranked["NickName"])
+        ranked["Team"] = resolved["team"]
+        self.frame = ranked
+
+        # Search keys, computed once per distinct value
+        self._logins = _keys(ranked["Login"], lambda v: v.strip().casefold())
+        self._nicknames = _keys(ranked["NickName"], normalize_tag)
+
+        # Rows of every team, best first
+        codes = ranked["Team"].cat.codes.to_numpy()
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(ranked["Team"].cat.categories) + 1))
+        self._team_rows = {
+            team: order[bounds[i]:bounds[i + 1]]
+            for i, team in enumerate(ranked["Team"].cat.categories)
+            if bounds[i + 1] > bounds[i]
+        }
+
+    def __len__(self):
+        return len(self.frame)
+
+    def teams(self):
+        """Teams with at least one ranked player, by best player."""
+        return sorted(self._team_rows, key=lambda team: self._team_rows[team][0])
+
+    def rows(self, team=None):
+        """Row numbers of the (optionally team-filtered) ranking."""
+        if team is None:
+            return np.arange(len(self.frame))
+        return self._team_rows.get(team, np.empty(0, dtype=np.int64))
+
+    def page_count(self, size, team=None):
+        return max(1, -(-len(self.rows(team)) // size))
+
+    def page(self, number, size, team=None):
+        """Rows of page `number` (1-based), clamped to the existing pages."""
+        rows = self.rows(team)
+        number = min(max(number, 1), self.page_count(size, team))
+        return self.frame.iloc[rows[(number - 1) * size:number * size]]
+
+    def find(self, query, team=None):
+        """
+        Offset, within the (filtered) ranking, of the best-ranked player whose
+        login equals `query` or, failing that, whose nickname matches it
+        (exact, then prefix, then substring; case and lookalikes ignored).
+        Returns None when nobody matches.
+        """
+        if not query or not query.strip():
+            return None
+        rows = self.rows(team)
+        login = query.strip().casefold()
+        nickname = normalize_tag(query)
+        logins, nicknames = self._logins[rows], self._nicknames[rows]
+        for matches in (
+            logins == login,
+            nicknames == nickname,
+            np.char.startswith(nicknames.astype(str), nickname),
+            np.char.find(nicknames.astype(str), nickname) >= 0,
+        ):
+            found = np.flatnonzero(matches)
+            if len(found):
+                return int(found[0])
+        return None
+
+
+def _keys(values, func):
+    codes, uniques = pd.factorize(pd.Series(values).astype(object))
+    keys = np.array([func(v) if isinstance(v, str) else "" for v in uniques] + [""], dtype=object)
+    return keys[codes]
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Map catalog parsed once from maps_dict.txt (UID <tab> display name).
+
+Every map gets an integer MapID (its line in the file) and typed fields
+derived from its name, e.g. "Very Short *192*":
+
+    short_key     "192"  (whatever is between the first pair of *...*)
+    challenge_id  192    (NA for named maps such as *GoodBye*)
+    decade, unit  190, 2 (the completion grid cell)
+
+Files are parsed once and cached until their modification time changes, so
+pages and loops can ask for the catalog (or a UID list) on every run.
+"""
+import os
+import re
+import threading
+import numpy as np
+import pandas as pd
+
+MAPS_DICT_PATH = "./resources/maps_dict.txt"
+
+_SHORT_KEY = re.compile(r"\*(.*?)\*")  # non-greedy: first pair of stars
+_cache = {}  # (kind, path) -> (stamp, value)
+_lock = threading.Lock()
+
+
+class MapCatalog:
+    """
+    Args:
+        frame (pd.DataFrame): one row per map, indexed by MapID (see parse_catalog).
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.uid_to_id = dict(zip(frame["uid"], frame.index))
+        self.uid_to_name = dict(zip(frame["uid"], frame["name"]))
+        keyed = frame.dropna(subset=["short_key"])
+        self.key_to_uid = {k.lower(): v for k, v in zip(keyed["short_key"], keyed["uid"])}
+
+    def __len__(self):
+        return len(self.frame)
+
+    def map_ids(self, uids):
+        """MapID of every UID of `uids` (-1 for maps missing from the catalog)."""
+        codes, uniques = pd.factorize(pd.Series(uids).astype(object))
+        # Look up each distinct UID once; code -1 (missing UID) maps to the trailing -1
+        ids = np.array([self.uid_to_id.get(uid, -1) for uid in uniques] + [-1], dtype=np.int64)
+        return ids[codes]
+
+    def fields(self, uids):
+        """Catalog row (uid, name, short_key, challenge_id, decade, unit) of every UID, NA when unknown."""
+        ids = self.map_ids(uids)
+        rows = self.frame.reindex(np.where(ids >= 0, ids, len(self.frame)))
+        return rows.set_index(pd.Index(ids, name="MapID"))
+
+
+def parse_catalog(path=MAPS_DICT_PATH):
+    """Read and parse `path` (no caching; see load_catalog)."""
+    uids, names = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line.strip():
+                continue
+            uid, _, name = line.partition("\t")
+            uids.append(uid.strip())
+            names.append(name)
+    frame = pd.concat([pd.DataFrame({"uid": uids, "name": names}), name_fields(names)], axis=1)
+    frame.index.name = "MapID"
+    return frame
+
+
+def name_fields(names):
+    """short_key, challenge_id, decade and unit parsed from map display names."""
+    keys = pd.Series([m.group(1) if isinstance(n, str) and (m := _SHORT_KEY.search(n)) else None
+                      for n in names], dtype=object)
+    challenge_id = pd.to_numeric(keys.where(keys.str.fullmatch(r"\d+", na=False))).astype("Int64")
+    return pd.DataFrame({
+        "short_key": keys,
+        "challenge_id": challenge_id,
+        "decade": (challenge_id // 10) * 10,
+        "unit": challenge_id % 10,
+    })
+
+
+def load_catalog(path=MAPS_DICT_PATH):
+    """Cached MapCatalog of `path`, re-parsed when the file changes."""
+    return _cached("catalog", path, lambda: MapCatalog(parse_catalog(path)))
+
+
+def load_uid_list(path):
+    """Cached list of the UIDs in `path` (one per line, # comments skipped)."""
+    def parse():
+        with open(path, "r", encoding="utf-8") as f:
+            return [u.strip() for u in f if u.strip() and not u.strip().startswith("#")]
+    return list(_cached("uids", path, parse))
+
+
+def _cached(kind, path, build):
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = (kind, os.path.abspath(path))
+    with _lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != stamp:
+            cached = _cache[key] = (stamp, build())
+        return cached[1]
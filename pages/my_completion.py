@@ -7,56 +7,76 @@ Created on Thu Oct  9 09:56:04 2025
 import streamlit as st
 import pandas as pd
 from renders import render_html_table,render_teams_table
-from app import load_data
-from score import assign_team_from_nickname, assign_points
+from app import current_snapshot
+from formatting import rank_categories
 import streamlit.components.v1 as components
 import altair as alt
+import numpy as np
 
 st.set_page_config(page_title="My achievements", layout="wide")
 st.title("Dodo challenge completion")
 
 
-# Load player and team data
-df = load_data("./resources/dedimania_all_records.csv")
+# Snapshot frame plus its player index and map grid coordinates (see player_index.py)
+snapshot = current_snapshot()
+df = snapshot.view()
+player_index = snapshot.panels["player_index"]
+map_coords = snapshot.panels["map_coords"]
+
+
+def completion(login):
+    """Decade/unit/rank of every numbered map `login` holds a record on."""
+    records = player_index.records(df, login)
+    codes = records["MapUID"].cat.codes.to_numpy()
+    records = records[codes >= 0]  # code -1: no MapUID, would index the last map
+    coords = map_coords.iloc[codes[codes >= 0]]
+    player = pd.DataFrame({
+        "Decade": coords["Decade"].to_numpy(),
+        "Challenge_Unit": coords["Challenge_Unit"].to_numpy(),
+        "Rank": records["Rank"].to_numpy(),
+    }).dropna(subset=["Decade"])
+    player["Decade"] = player["Decade"].astype(int)
+    player["Challenge_Unit"] = player["Challenge_Unit"].astype(int)
+    player['Rank_Category'] = rank_categories(player['Rank'])
+    return player
+
+
+def label(login):
+    rows = player_index.rows(login)
+    return f"{df['NickName'].iloc[rows[-1]]} ({login})" if len(rows) else login
+
+
+def completion_grid(player, decades):
+    """Every (decade, unit) cell of `decades` with the player's rank, if any."""
+    grid = pd.DataFrame({
+        "Decade": np.repeat(decades, 10).astype(int),
+        "Challenge_Unit": np.tile(np.arange(10), len(decades)),
+    })
+    return grid.merge(player[['Decade', 'Challenge_Unit', 'Rank_Category', 'Rank']], how='left')
 
-teams_df = pd.read_csv("./resources/teams.csv", sep = "\t", engine="python")
 
 # Manual login addition
-manual_login = st.sidebar.text_input("Add player by Login (case-sensitive)")
+manual_login = st.sidebar.text_input("Add player by Login (any case)")
 if manual_login:
-    extra_player = df[df["Login"].str.lower() == manual_login.lower()]
-    if not extra_player.empty:
-        st.sidebar.success(f"✅ Added {extra_player['NickName'].iloc[-1]}")
-        df_team = pd.concat([teams_df, extra_player])
+    if manual_login in player_index:
+        rows = player_index.rows(manual_login)
+        st.sidebar.success(f"✅ Added {df['NickName'].iloc[rows[-1]]}")
     else:
         st.sidebar.error(f"❌ No player found with login '{manual_login}'")
-        
-# Step 1: Extract challenge ID and map to decades
-df=df[df["Login"]==manual_login]
-df['Challenge_ID'] = df['Challenge'].str.extract(r'\*(\d+)\*')
-df = df.dropna(subset=['Challenge_ID'])
-df["Challenge_ID"] = df["Challenge_ID"].astype(int)
-df['Decade'] = (df['Challenge_ID'] // 10) * 10  # Grouping by decade (0-9 -> 0, 10-19 -> 10, etc.)
-df['Challenge_Unit'] = df['Challenge_ID'] % 10
-
-def rank_to_category(rank):
-    if pd.isna(rank): return 'Not Completed'
-    elif rank == 1: return 'Gold'
-    elif rank == 2: return 'Silver'
-    elif rank == 3: return 'Bronze'
-    elif rank <= 10: return 'Top 10'
-    elif rank <= 20: return 'Top 20'
-    elif rank <= 30: return 'Top 30'
-    else: return 'Other'
-    
-df['Rank_Category'] = df['Rank'].apply(rank_to_category)
-
-
-# --- Step 4: Prepare grid of all possible (decade, unit) combinations ---
-decades = sorted(df['Decade'].unique())
+
+# Side-by-side comparison with other players
+compare_logins = st.sidebar.text_input("Compare with (logins, comma-separated)")
+others = [login.strip() for login in compare_logins.split(",") if login.strip()]
+missing = [login for login in others if login not in player_index]
+if missing:
+    st.sidebar.error(f"❌ No player found with login {', '.join(repr(m) for m in missing)}")
+others = [login for login in others if login in player_index]
+logins = ([manual_login] if manual_login or not others else []) + others
+
+players = {login: completion(login) for login in logins}
+# Same decade rows for every player so the grids line up
+decades = sorted(set().union(*(set(p['Decade'].unique()) for p in players.values())))
 units = list(range(10))
-grid = pd.DataFrame([(d, u) for d in decades for u in units], columns=['Decade', 'Challenge_Unit'])
-plot_df = grid.merge(df[['Decade', 'Challenge_Unit', 'Rank_Category', 'Rank']], how='left')
 
 # --- Step 6: Color mapping ---
 color_domain = ['Gold', 'Silver', 'Bronze', 'Top 10', 'Top 20', 'Top 30', 'Not Completed']
@@ -70,38 +90,46 @@ color_range = [
 tile_size = 40
 width = tile_size * 14                      # 10 challenge units
 height = tile_size * len(decades)          # dynamic based on # of decades
-plot_df['Challenge_Unit'] = plot_df['Challenge_Unit'].astype(str)
-
-print(plot_df)
-heatmap = alt.Chart(plot_df).mark_rect(
-    cornerRadius=8,
-    stroke= '#1e1e1e',
-    strokeWidth=3
-).encode(
-    x=alt.X('Challenge_Unit:O',
-        sort=['1', '2', '3', '4', '5', '6', '7', '8', '9', '0'],
-            title='dodo',
-            axis=alt.Axis(labelColor='white', titleColor='white',orient = "top"),
-            scale=alt.Scale(padding=0, align=0.5)),
-
-    y=alt.Y('Decade:O',
-            title='dodo',
-            axis=alt.Axis(labelColor='white', titleColor='white'),
-            scale=alt.Scale(padding=0, align=0.5)),
-    color=alt.Color('Rank_Category:N',
-                    scale=alt.Scale(domain=color_domain, range=color_range),
-                    legend=alt.Legend(title='Rank Category', labelColor='white', titleColor='white')),
-    tooltip=['Decade', 'Challenge_Unit', 'Rank', 'Rank_Category']
-).properties(
-    width=width,
-    height=height,
-    background='#1e1e1e',
-    title=alt.TitleParams(
-        text="Hover to see ranks",
-        color='white',
-        anchor='start'
+
+
+def heatmap(plot_df, title):
+    plot_df['Challenge_Unit'] = plot_df['Challenge_Unit'].astype(str)
+    return alt.Chart(plot_df).mark_rect(
+        cornerRadius=8,
+        stroke= '#1e1e1e',
+        strokeWidth=3
+    ).encode(
+        x=alt.X('Challenge_Unit:O',
+            sort=['1', '2', '3', '4', '5', '6', '7', '8', '9', '0'],
+                title='dodo',
+                axis=alt.Axis(labelColor='white', titleColor='white',orient = "top"),
+                scale=alt.Scale(padding=0, align=0.5)),
+
+        y=alt.Y('Decade:O',
+                title='dodo',
+                axis=alt.Axis(labelColor='white', titleColor='white'),
+                scale=alt.Scale(padding=0, align=0.5)),
+        color=alt.Color('Rank_Category:N',
+                        scale=alt.Scale(domain=color_domain, range=color_range),
+                        legend=alt.Legend(title='Rank Category', labelColor='white', titleColor='white')),
+        tooltip=['Decade', 'Challenge_Unit', 'Rank', 'Rank_Category']
+    ).properties(
+        width=width,
+        height=height,
+        background='#1e1e1e',
+        title=alt.TitleParams(
+            text=title,
+            color='white',
+            anchor='start'
+        )
     )
-)
+
 
 # --- Step 8: Show in Streamlit ---
-st.altair_chart(heatmap,use_container_width = False)  # Don't use use_container_width=True
+if len(players) == 1:
+    player = next(iter(players.values()))
+    st.altair_chart(heatmap(completion_grid(player, decades), "Hover to see ranks"), use_container_width = False)  # Don't use use_container_width=True
+else:
+    for column, (login, player) in zip(st.columns(len(players)), players.items()):
+        with column:
+            st.altair_chart(heatmap(completion_grid(player, decades), label(login)), use_container_width = False)
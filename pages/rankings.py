@@ -3,7 +3,9 @@ import pandas as pd
 import altair as alt
 import os
 from datetime import datetime
-from daily_updater import start_daily_updater, CSV_PATH
+from daily_updater import start_daily_updater
+from series_index import index_version, open_series_index
+from downsample import downsample, point_budget
 
 st.set_page_config(page_title="Player Progress", layout="wide")
 
@@ -14,79 +16,65 @@ if "daily_updater_started" not in st.session_state:
 
 st.title("📈 Player Point Progression Over Time")
 
+# Charts span the wide layout; series longer than the pixels can show are downsampled
+CHART_WIDTH = int(os.getenv("DEDI_CHART_WIDTH", "1200"))
+
 # --- Load Data ---
-@st.cache_data(ttl=3600 * 6)
-def load_points():
-    if os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH, parse_dates=["recorded_at"])
-        df["recorded_at"] = pd.to_datetime(df["recorded_at"])
-        return df
-    else:
-        st.warning("No data available yet. Please wait for first sync.")
-        return pd.DataFrame()
-
-@st.cache_data
-def load_teams():
-    path = "./resources/teams.csv"
-    if os.path.exists(path):
-        return pd.read_csv(path, sep = "\t", engine="python")
-    else:
-        st.warning("⚠️ No teams.csv found — teams will not be displayed.")
-        return pd.DataFrame(columns=["Login", "Team"])
+# Series index shared by every session, reopened once per sync or teams.csv edit (see series_index.py)
+@st.cache_resource(max_entries=1)
+def load_index(version):
+    return open_series_index()
 
-df = load_points()
-teams_df = load_teams()
+index = load_index(index_version())
+players = index.players
 
-if df.empty:
+if players.empty:
+    st.warning("No data available yet. Please wait for first sync.")
     st.stop()
 
-# --- Merge teams ---
-df = df.merge(teams_df, how="left", left_on="login", right_on="Login")
-df["Team"] = df["Team"].fillna("No team")
-df = df.drop_duplicates()
 # --- Sidebar Filters ---
 st.sidebar.header("Filters")
 
 # Team selection
-teams = sorted(df["Team"].unique())
+teams = sorted(players["Team"].unique())
 selected_teams = st.sidebar.multiselect("Select teams", teams, default=teams[:3])
 
-# Filter by team
-df_team = df[df["Team"].isin(selected_teams)]
+# Players of the selected teams
+logins = set().union(*(index.team_logins.get(team, set()) for team in selected_teams))
 
 # Manual login addition
 manual_login = st.sidebar.text_input("Add player by Login (case-sensitive)")
 if manual_login:
-    extra_player = df[df["login"].str.lower() == manual_login.lower()]
+    extra_player = players[players["login"].str.lower() == manual_login.lower()]
     if not extra_player.empty:
         st.sidebar.success(f"✅ Added {extra_player['nickname'].iloc[-1]}")
-        df_team = pd.concat([df_team, extra_player])
+        logins.update(extra_player["login"])
     else:
         st.sidebar.error(f"❌ No player found with login '{manual_login}'")
 
 # --- Date range filter ---
-date_min, date_max = df["recorded_at"].min(), df["recorded_at"].max()
+date_min, date_max = (day.to_pydatetime() for day in index.date_range())
 date_range = st.sidebar.slider(
     "Select date range",
-    min_value=date_min.to_pydatetime(),
-    max_value=date_max.to_pydatetime(),
-    value=(date_min.to_pydatetime(), date_max.to_pydatetime()),
+    min_value=date_min,
+    max_value=date_max,
+    value=(date_min, date_max),
 )
 
-df_filtered = df_team[df_team["recorded_at"].between(*date_range)]
+# Slices of the selected players' series; team, label and deltas are precomputed
+df_filtered = index.select(logins, *date_range)
 
 if df_filtered.empty:
     st.warning("No data for the selected filters.")
     st.stop()
 
-# --- Ensure unique color by login, display nickname ---
-df_filtered["display_label"] = df_filtered.apply(
-    lambda r: f"{r['nickname']} ({r['login']})", axis=1
-)
+# Kept points are original rows, so tooltips stay exact; narrow the range for every day
+budget = point_budget(CHART_WIDTH, df_filtered["login"].nunique())
+df_chart = downsample(df_filtered, "recorded_at", "score", "login", budget, method="lttb")
 
 # --- Chart 1: Total Score Over Time ---
 chart1 = (
-    alt.Chart(df_filtered)
+    alt.Chart(df_chart)
     .mark_line(point=True)
     .encode(
         x=alt.X("recorded_at:T", title="Date"),
@@ -106,21 +94,8 @@ chart1 = (
 st.altair_chart(chart1, use_container_width=True)
 
 # --- Chart 2: Daily Differential (ΔPoints) ---
-# Compute daily difference per player
-# 1️⃣ Ensure recorded_at is datetime
-df_filtered["recorded_at"] = pd.to_datetime(df_filtered["recorded_at"], errors="coerce")
-# 3️⃣ Compute day-by-day difference per player
-df_diff = (
-    df_filtered
-    .sort_values(["login", "recorded_at"])
-    .groupby("login", group_keys=False)
-    .apply(lambda g: g.assign(diff=g["score"].diff()))
-    .dropna(subset=["diff"])
-)
-
-
-# 4️⃣ Clean up
-df_diff["recorded_at"] = pd.to_datetime(df_diff["recorded_at"])
+df_diff = df_filtered.dropna(subset=["diff"])
+df_diff = downsample(df_diff, "recorded_at", "diff", "login", budget, method="minmax")  # keeps every spike
 
 chart2 = (
     alt.Chart(df_diff.dropna(subset=["diff"]))
@@ -142,6 +117,12 @@ chart2 = (
 
 st.altair_chart(chart2, use_container_width=True)
 
+if len(df_chart) < len(df_filtered):
+    st.caption(
+        f"📉 Showing {len(df_chart)} of {len(df_filtered)} points "
+        f"(about {budget} per player); narrow the date range to see every day."
+    )
+
 # --- Footer Info ---
 st.caption(
     f"💾 Data source: player_daily_scores (updated daily) • "
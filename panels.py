@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Dashboard materializations.
+
+Every aggregate shown by app.py and pages/teams.py is computed once per
+snapshot, right after a fetch lands, and published with it. Page reruns
+only read these small frames.
+"""
+from datetime import datetime, timedelta
+import pandas as pd
+from schema import canonicalize
+from score import rank_points, scoring_function
+from leaderboard import RankIndex
+from player_index import PlayerIndex, map_coordinates
+
+TEAMS_PATH = "./resources/teams.csv"
+DERIVED_PANELS = ("solo_ranking", "player_index", "map_coords")  # rebuilt by derive_panels, never stored
+
+
+def materialize(df, leaderboard=None):
+    """
+    Return the dashboard frame for a fetched/loaded records frame, and its panels.
+    With a LeaderboardAggregator, only the maps in df.attrs["changed_uids"] are re-scored.
+    """
+    frame = canonicalize(df.dropna(subset=["RecordDate"]))
+    return frame, build_panels(frame, leaderboard=leaderboard)
+
+
+def build_panels(df, now=None, leaderboard=None):
+    now = now or datetime.now()
+    panels = {}
+
+    # --- Latest records ---
+    panels["recent_records"] = df.nlargest(100, "RecordDate")[
+        ["Challenge", "NickName", "Record", "Rank", "RecordDate"]
+    ].reset_index(drop=True)
+
+    # --- Most disputed maps ---
+    recent_df = df[df["RecordDate"] >= now - timedelta(days=7)]
+    panels["active_maps"] = (
+        recent_df.groupby(["Challenge"], observed=True)
+        .size()
+        .reset_index(name="NewRecords")
+        .sort_values("NewRecords", ascending=False)
+        .head(10)
+    )
+
+    # --- Player most records ---
+    panels["player_most_records"] = (
+        df.groupby(["NickName", "Login"], observed=True)
+        .size()
+        .reset_index(name="MostRecords")
+        .sort_values("MostRecords", ascending=False)
+        .head(10)
+    )
+
+    # --- Top players (best record overall) ---
+    panels["top_players"] = (
+        df[df["Rank"] == 1]
+        .groupby(["Login", "NickName"], observed=True)
+        .size()
+        .reset_index(name="Top1_Count")
+        .sort_values("Top1_Count", ascending=False)
+        .head(10)
+    )
+
+    # --- Solo leaderboard & teams ---
+    if leaderboard is not None:
+        leaderboard.update(df, df.attrs.get("changed_uids"))
+        panels["solo_leaderboard"] = leaderboard.players_frame()
+        panels["team_scores"] = leaderboard.teams_frame()
+        panels["team_players"] = leaderboard.team_players_frame()
+    else:
+        panels["solo_leaderboard"] = scoring_function(df)
+        team_scores, team_players = build_team_panels(df)
+        panels["team_scores"] = team_scores
+        panels["team_players"] = team_players
+    return derive_panels(df, panels)
+
+
+def derive_panels(df, panels):
+    """Add the indexes built from the frame and the other panels (DERIVED_PANELS)."""
+    panels["solo_ranking"] = RankIndex(panels["solo_leaderboard"])  # sorted, paginated view
+    panels["player_index"] = PlayerIndex(df)  # login -> row positions of df
+    panels["map_coords"] = map_coordinates(df)  # MapUID category -> grid decade/unit
+    return panels
+
+
+def load_teams(path=TEAMS_PATH):
+    teams_df = pd.read_csv(path, sep="\t", engine="python")
+    teams_df.columns = teams_df.columns.str.strip().str.lower()
+    teams_df["login"] = teams_df["login"].str.lower()
+    return teams_df.drop_duplicates(subset="login")
+
+
+def team_lookup(teams_df=None):
+    """Lowercased login -> team, as used by LeaderboardAggregator."""
+    teams_df = load_teams() if teams_df is None else teams_df
+    return dict(zip(teams_df["login"], teams_df["team"]))
+
+
+def build_team_panels(df, teams_df=None):
+    """Team totals, and per team/player points (for the per-team top lists)."""
+    teams_df = load_teams() if teams_df is None else teams_df
+    scored = pd.DataFrame({
+        "login": df["Login"].astype(str).str.lower(),
+        "NickName": df["NickName"],
+        "Score": rank_points(df["Rank"]),
+    })
+    merged = scored.merge(teams_df[["login", "team"]], how="left", on="login")
+
+    team_scores = (
+        merged.groupby("team", dropna=True)["Score"]
+        .sum()
+        .reset_index()
+        .sort_values("Score", ascending=False)
+    )
+    team_scores.Score = team_scores.Score.astype(int)
+
+    team_players = (
+        merged.dropna(subset=["team"])
+        .groupby(["team", "NickName"], observed=True)["Score"]
+        .sum()
+        .reset_index()
+        .sort_values(["team", "Score"], ascending=[True, False])
+    )
+    team_players.Score = team_players.Score.astype(int)
+    return team_scores.reset_index(drop=True), team_players.reset_index(drop=True)
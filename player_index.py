@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Per-player row index of a snapshot frame, and the grid coordinates of maps.
+
+PlayerIndex groups the row positions of every login once per snapshot
+(case-insensitively), so a player's records are a take of a few hundred rows
+whatever the size of the frame. map_coordinates joins every map with the map
+catalog to place it on the completion grid (decade row, unit column).
+"""
+import numpy as np
+import pandas as pd
+from map_catalog import load_catalog, name_fields
+
+
+class PlayerIndex:
+    """
+    Args:
+        frame (pd.DataFrame): snapshot frame with a categorical Login column.
+    """
+
+    def __init__(self, frame):
+        logins = frame["Login"]
+        if not isinstance(logins.dtype, pd.CategoricalDtype):
+            logins = logins.astype("category")
+        codes = logins.cat.codes.to_numpy()
+
+        # Rows grouped by login code, each group in frame order
+        self._order = np.argsort(codes, kind="stable")
+        categories = logins.cat.categories
+        bounds = np.searchsorted(codes[self._order], np.arange(len(categories) + 1))
+
+        # Logins differing only by case share a key
+        self._codes = {}
+        for code, login in enumerate(categories):
+            if bounds[code + 1] > bounds[code]:
+                self._codes.setdefault(str(login).casefold(), []).append(code)
+        self._bounds = bounds
+        self.frame = pd.DataFrame({"Login": categories, "start": bounds[:-1], "stop": bounds[1:]})
+
+    def __contains__(self, login):
+        return isinstance(login, str) and login.strip().casefold() in self._codes
+
+    def rows(self, login):
+        """Row positions of `login` (any case) in the snapshot frame, in frame order."""
+        codes = self._codes.get(login.strip().casefold(), []) if isinstance(login, str) else []
+        parts = [self._order[self._bounds[c]:self._bounds[c + 1]] for c in codes]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+    def records(self, frame, login):
+        """Rows of `login` in `frame` (the frame the index was built on)."""
+        return frame.iloc[self.rows(login)]
+
+
+def map_coordinates(frame, catalog=None):
+    """
+    MapID, challenge ID, decade and unit of every MapUID category of `frame`
+    (one row per category, in category order), from the map catalog. Maps
+    missing from the catalog are placed from their Challenge name; NA for
+    maps without a *N* ID.
+    """
+    catalog = load_catalog() if catalog is None else catalog
+    maps = frame["MapUID"]
+    if not isinstance(maps.dtype, pd.CategoricalDtype):
+        maps = maps.astype("category")
+    categories = maps.cat.categories
+    fields = catalog.fields(categories)[["challenge_id", "decade", "unit"]].reset_index()
+
+    unknown = np.flatnonzero(fields["MapID"].to_numpy() < 0)
+    if len(unknown):
+        # Challenge name of those maps: first row carrying each MapUID code
+        codes = maps.cat.codes.to_numpy()
+        rows = pd.Series(np.arange(len(codes))).groupby(codes).first()
+        names = frame["Challenge"].astype(object).to_numpy()[rows.reindex(unknown).fillna(0).astype(int)]
+        names = np.where(rows.reindex(unknown).notna(), names, None)
+        parsed = name_fields(names)
+        fields.loc[unknown, ["challenge_id", "decade", "unit"]] = parsed[["challenge_id", "decade", "unit"]].to_numpy()
+
+    return pd.DataFrame({
+        "MapUID": categories,
+        "MapID": fields["MapID"].to_numpy(),
+        "Challenge_ID": fields["challenge_id"].astype("Int64").array,
+        "Decade": fields["decade"].astype("Int64").array,
+        "Challenge_Unit": fields["unit"].astype("Int64").array,
+    })
@@ -6,56 +6,26 @@ Created on Tue Oct  7 08:57:04 2025
 """
 
 import streamlit as st
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 import streamlit.components.v1 as components
 from datetime import datetime, timedelta, timezone
-from fetcher import last_updated   # <— import from your background fetcher
-
-# Load teams safely
-TEAMS_PATH = "./resources/teams.csv"
-teams_df = pd.read_csv(TEAMS_PATH, sep = "\t", engine="python")
-teams_map = dict(zip(teams_df["Login"], teams_df["Team"]))
-
-# Define colors for known teams
-TEAM_COLORS = {
-    "ĊĦ »": "#1f77b4",   # Blue
-    "ѕнιғт": "#ff7f0e",  # Orange
-    "LeG": "#2ca02c",    # Green
-    "нот": "#d62728",    # Red
-    "Јғғ": "#9467bd",    # Purple
-    "Сяс": "#8c564b",    # Brown
-    "הѕс": "#e377c2",    # Pink
-    "»тят": "#7f7f7f",   # Gray
-    "νѕρ": "#bcbd22",    # Yellow-green
-    "ғฟ๏": "#17becf",    # Teal
-    "ѕωα": "#1a55FF",    # Strong Blue
-    "Law": "#FF1493",    # Deep Pink
-    "4W : : ": "#FFD700",# Gold
-    "nsc": "#A52A2A",    # Dark Red
-    "»ЯтА": "#228B22",   # Forest Green
-    "ωаѕρ .": "#DAA520", # Goldenrod
-    "ғаιהτ.": "#00CED1", # Dark Turquoise
-    "sigN": "#DC143C",   # Crimson
-    "GC l|": "#4682B4",  # Steel Blue
-    "kings": "#800000",  # Maroon
-}
 
-def render_html_table(title: str, df, columns: list[str]):
-    """
-    Render a styled HTML table inside Streamlit, using the dark leaderboard theme.
-    
-    Args:
-        title (str): Section title (e.g., "Top Players by #1 Ranks")
-        df (pd.DataFrame): The dataframe to render.
-        columns (list[str]): Column names (in the order they should appear).
-    """
+from team_index import TEAM_COLORS, default_index
+from formatting import time_ago, time_ago_labels, text_labels, fixed_labels, rank_labels
 
-    st.markdown(f"### {title}")
+# ---------------------------
+# Table templates
+# ---------------------------
+# Rows are produced by one str.format per row from precompiled templates and
+# joined once; cells are formatted a whole column at a time.
 
-    html = """
-    <html>
-    <head>
-    <style>
+_TABLE_HEAD = """<html>
+<head>
+<style>
     body {
         background-color: transparent;
         color: #e6edf3;
@@ -91,56 +61,17 @@ def render_html_table(title: str, df, columns: list[str]):
         background-color: rgba(88,166,255,0.08);
         transition: background 0.2s ease;
     }
-    </style>
-    </head>
-    <body>
-    <div class="table-box">
-        <table>
-            <thead>
-                <tr>
-    """
-    # headers
-    for col in columns:
-        html += f"<th>{col}</th>"
-    html += "</tr></thead><tbody>"
-    
-    # rows
-    for _, row in df.iterrows():
-        html += "<tr>"
-        for col in columns:
-            cell_value = row[col]
-            cell_class = "nickname" if col.lower() == "nickname" else ""
-            html += f'<td class="{cell_class}">{cell_value}</td>'
-        html += "</tr>"
-    
-    html += "</tbody></table></div></body></html>"
-
-
-    return(html)
-
-
-def render_score_table(title: str, df, columns: list[str]):
-    """
-    Render a styled HTML table inside Streamlit, using the dark leaderboard theme.
-
-    Args:
-        title (str): Section title (e.g., "Top Players by #1 Ranks")
-        df (pd.DataFrame): The dataframe to render.
-        columns (list[str]): Column names (in the order they should appear). 
-                             'Login' will be used only for tooltip if included.
-    """
-    import streamlit as st
-
-    st.markdown(f"### {title}")
-
-    # Sort by Points descending
-    df_sorted = df.sort_values(by='Points', ascending=False).reset_index(drop=True)
-
-    # Start HTML
-    html = """
-    <html>
-    <head>
-    <style>
+</style>
+</head>
+<body>
+<div class="table-box">
+    <table>
+        <thead>
+            <tr>"""
+
+_SCORE_TABLE_HEAD = """<html>
+<head>
+<style>
     body {
         background-color: transparent;
         color: #e6edf3;
@@ -170,31 +101,15 @@ def render_score_table(title: str, df, columns: list[str]):
         border-bottom: 1px solid #2d313a;
         font-size: 0.95em;
     }
- 
-    </style>
-    </head>
-    <body>
-    <div class="table-box">
-        <table>
-            <thead>
-                <tr>
-    """
-    # Only include visible columns (skip Login)
-    all_columns = columns.copy()
-    if "Team" not in all_columns:
-        all_columns.insert(1, "Team")  # place after NickName
-    
-    html += """
-    <style>
     .top-1 { background-color: rgba(255,215,0,0.08);font-weight: 900; }
     .top-2 { background-color: rgba(192,192,192,0.08); }
     .top-3 { background-color: rgba(205,127,50,0.08); }
-    
+
     tr:hover {
         background-color: rgba(88,166,255,0.08);
         transition: background 0.2s ease;
     }
-    
+
     .nickname {
     color: #58a6ff;
     font-weight: 600;
@@ -204,8 +119,8 @@ def render_score_table(title: str, df, columns: list[str]):
     overflow: hidden;
     text-overflow: ellipsis;
     }
-    
-    
+
+
     .nickname:hover::after {
         content: attr(data-login);
         position: absolute;
@@ -219,7 +134,7 @@ def render_score_table(title: str, df, columns: list[str]):
         white-space: nowrap;
         box-shadow: 0 2px 6px rgba(0,0,0,0.4);
     }
-    
+
     .team-badge {
         display: inline-block;
         border-radius: 999px;
@@ -229,99 +144,487 @@ def render_score_table(title: str, df, columns: list[str]):
         text-align: center;
         min-width: 70px;
     }
-    </style>
+</style>
+</head>
+<body>
+<div class="table-box">
+    <table>
+        <thead>
+            <tr>"""
+
+_RECENT_RECORDS_HEAD = """<html>
+<head>
+<style>
+    body {
+        background-color: transparent;
+        color: #e6edf3;
+        font-family: 'Segoe UI', Roboto, sans-serif;
+    }
+    .records-box {
+        background: linear-gradient(145deg, #1a1d25, #11141a);
+        border-radius: 14px;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.5);
+        padding: 1.2em;
+        margin-top: 0.5em;
+    }
+    table {
+        width: 100%;
+        border-collapse: collapse;
+    }
+    th {
+        text-align: left;
+        padding: 0.5em;
+        color: #8b949e;
+        border-bottom: 1px solid #2d313a;
+        font-size: 0.9em;
+    }
+    td {
+        padding: 0.6em;
+        border-bottom: 1px solid #2d313a;
+        font-size: 0.95em;
+    }
+    tr:hover {
+        background-color: rgba(88,166,255,0.08);
+        transition: background 0.2s ease;
+    }
+    .nickname { color: #58a6ff; font-weight: 600; }
+    .record { color: #3fb950; font-weight: 600; }
+    .rank { color: #f1c40f; font-weight: 600; }
+</style>
+</head>
+<body>
+<div class="records-box">
+    <table>
+        <thead>
+            <tr>
+                <th>Challenge</th>
+                <th>Nickname</th>
+                <th>Record</th>
+                <th>Rank</th>
+                <th>Set on</th>
+            </tr>
+        </thead>
+        <tbody>"""
+
+_TABLE_FOOT = "</tbody></table></div></body></html>"
+
+_RECENT_RECORD_ROW = (
+    '<tr><td>{}</td><td class="nickname">{}</td><td class="record">{}</td>'
+    '<td class="rank">{}</td><td>{}</td></tr>'
+)
+
+# (panel, version) -> html: finished fragments, least recently used first
+MAX_FRAGMENTS = 128
+_fragments = OrderedDict()
+_fragment_content = {}  # panel -> content version of its latest fragment
+_fragments_lock = threading.Lock()
+
+
+def cached_fragment(key, build):
+    """
+    HTML returned by build(), built once per key = (panel, version) and
+    shared by every session and rerun. No key means no caching.
+    A version may be a tuple whose first item is the panel's content version
+    (e.g. plus the page shown); a new content version drops the panel's older
+    fragments, and at most MAX_FRAGMENTS are kept.
     """
+    if key is None:
+        return build()
+    with _fragments_lock:
+        html = _fragments.get(key)
+        if html is not None:
+            _fragments.move_to_end(key)
+            return html
+    html = build()
+    panel, version = key
+    content = version[0] if isinstance(version, tuple) else version
+    with _fragments_lock:
+        if _fragment_content.get(panel) != content:
+            _fragment_content[panel] = content
+            for old in [k for k in _fragments if k[0] == panel]:
+                del _fragments[old]
+        _fragments[key] = html
+        while len(_fragments) > MAX_FRAGMENTS:
+            _fragments.popitem(last=False)
+    return html
+
+
+def _rows(template, *columns):
+    """Join one formatted template per row, in a single pass."""
+    return "".join(map(template.format, *columns))
+
+
+def _podium(n, offset=0):
+    """Row classes highlighting the top 3, for `n` rows starting at row `offset`."""
+    podium = ["top-1", "top-2", "top-3"][offset:offset + n]
+    return podium + [""] * (n - len(podium))
+
+
+def render_html_table(title: str, df, columns: list[str], key=None):
+    """
+    Render a styled HTML table inside Streamlit, using the dark leaderboard theme.
     
-    # Table headers
+    Args:
+        title (str): Section title (e.g., "Top Players by #1 Ranks")
+        df (pd.DataFrame): The dataframe to render.
+        columns (list[str]): Column names (in the order they should appear).
+        key (tuple): Optional (panel, snapshot version) to reuse the HTML across reruns.
+    """
+
+    st.markdown(f"### {title}")
+    return cached_fragment(key, lambda: _html_table(df, columns))
+
+
+def _html_table(df, columns):
+    header = "".join(f"<th>{col}</th>" for col in columns)
+    row = "<tr>" + "".join(
+        '<td class="{}">{{}}</td>'.format("nickname" if col.lower() == "nickname" else "")
+        for col in columns
+    ) + "</tr>"
+    body = _rows(row, *(text_labels(df[col]) for col in columns))
+    return f"{_TABLE_HEAD}{header}</tr></thead><tbody>{body}{_TABLE_FOOT}"
+
+
+def render_score_table(title: str, df, columns: list[str], key=None, offset=0):
+    """
+    Render a styled HTML table inside Streamlit, using the dark leaderboard theme.
+
+    Args:
+        title (str): Section title (e.g., "Top Players by #1 Ranks")
+        df (pd.DataFrame): The dataframe to render.
+        columns (list[str]): Column names (in the order they should appear). 
+                             'Login' will be used only for tooltip if included.
+        key (tuple): Optional (panel, snapshot version) to reuse the HTML across reruns.
+        offset (int): Rows ranked above `df` (for pages of a RankIndex), for the podium.
+    """
+    import streamlit as st
+
+    st.markdown(f"### {title}")
+    return cached_fragment(key, lambda: _score_table(df, columns, offset))
+
+
+def _score_table(df, columns, offset=0):
+    # Sort by Points descending
+    df_sorted = df.sort_values(by='Points', ascending=False, kind="stable").reset_index(drop=True)
+
+    # Only include visible columns (skip Login)
+    all_columns = columns.copy()
+    if "Team" not in all_columns:
+        after = all_columns.index("NickName") + 1 if "NickName" in all_columns else 1
+        all_columns.insert(after, "Team")  # place after NickName
+    all_columns = [col for col in all_columns if col != "Login"]
+
+    # Team and color of every row in one pass (teams.csv login, else nickname tag)
+    resolved = default_index().resolve(
+        df_sorted.get("Login", pd.Series(None, index=df_sorted.index)),
+        df_sorted.get("NickName"),
+    )
+    teams = resolved["team"].cat.categories
+    badges = {
+        team: (
+            f'<span class="team-badge" style="color:{color}; border:1px solid {color}; '
+            f'background-color:rgba(255,255,255,0.00);">{team}</span>'
+        )
+        for team, color in zip(teams, pd.Series(default_index().colors_of(teams)).astype(object).fillna(""))
+        if team
+    }
+
+    top_class = _podium(len(df_sorted), offset)
+    cells, columns_out = [], []
     for col in all_columns:
-        if col != "Login":
-            html += f"<th>{col}</th>"
-    html += "</tr></thead><tbody>"
-    
-    # Rows
-    for i, (_, row) in enumerate(df_sorted.iterrows()):
-        # Top 1–3 highlighting
-        top_class = ""
-        if i == 0:
-            top_class = "top-1"
-        elif i == 1:
-            top_class = "top-2"
-        elif i == 2:
-            top_class = "top-3"
-    
-        login = str(row.get("Login", "")).strip().lower()
-        team = teams_map.get(login, "")
-        if pd.isna(team):
-            team = "soloplayer"
-        team_color = ""
-        for key, color in TEAM_COLORS.items():
-            if key in team.lower():
-                team_color = color
-                break
-    
-        html += f'<tr class="{top_class}">'
-    
-        for col in all_columns:
-            if col == "Login":
-                continue  # Skip Login column entirely
-            cell_value = row.get(col, "")
-            
-            if col == "Average_Rank":
-                cell_value = f"{float(cell_value):.2f}"
-                
-            if col == "NickName":
-                login_value = row["Login"]
-                html += (
-                    f'<td class="nickname {top_class}" '
-                    f'data-login="Login: {login_value}">{cell_value}</td>'
-                )
-              
-            elif col == "Team":
-                if team:
-                    badge_html = (
-                        f'<span class="team-badge" '
-                        f'style="color:{team_color}; '
-                        f'border:1px solid {team_color}; '
-                        f'background-color:rgba(255,255,255,0.00);">'
-                        f'{team}</span>'
-                    )
-                    html += f"<td>{badge_html}</td>"
-                else:
-                    html += "<td></td>"
-            else:
-                html += f'<td class="{top_class}">{cell_value}</td>'
-    
-        html += "</tr>"
+        if col == "NickName":
+            cells.append('<td class="nickname {}" data-login="Login: {}">{}</td>')
+            columns_out += [top_class, text_labels(df_sorted["Login"]), text_labels(df_sorted["NickName"])]
+        elif col == "Team":
+            cells.append("<td>{}</td>")
+            badge_of = np.array([badges.get(team, "") for team in teams] + [""], dtype=object)
+            columns_out.append(badge_of[resolved["team"].cat.codes.to_numpy()].tolist())
+        elif col == "Average_Rank":
+            cells.append('<td class="{}">{}</td>')
+            columns_out += [top_class, fixed_labels(df_sorted[col])]
+        else:
+            cells.append('<td class="{}">{}</td>')
+            columns_out += [top_class, text_labels(df_sorted.get(col, pd.Series("", index=df_sorted.index)))]
+    row = '<tr class="{}">' + "".join(cells) + "</tr>"
+
+    header = "".join(f"<th>{col}</th>" for col in all_columns)
+    body = _rows(row, top_class, *columns_out)
+    return f"{_SCORE_TABLE_HEAD}{header}</tr></thead><tbody>{body}</tbody></table></div></body></html>"
 
-    return html
 
-def _time_ago(dt):
-    if not dt:
-        return "Fetching..."
-    now = datetime.now(timezone.utc)
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    diff = now - dt
-    s = diff.total_seconds()
-    if s < 60:
-        return f"{int(s)}s ago"
-    elif s < 3600:
-        return f"{int(s // 60)} min ago"
-    elif s < 86400:
-        return f"{int(s // 3600)} h ago"
+def render_recent_records(df, key=None):
+    """
+    Latest records table (Challenge, NickName, Record, Rank, RecordDate);
+    RecordDate is shown as "x min ago".
+    """
+    return cached_fragment(key, lambda: _recent_records(df))
+
+
+def _recent_records(df):
+    body = _rows(
+        _RECENT_RECORD_ROW,
+        text_labels(df["Challenge"]),
+        text_labels(df["NickName"]),
+        fixed_labels(df["Record"]),
+        rank_labels(df["Rank"]),
+        time_ago_labels(df["RecordDate"]),
+    )
+    return f"{_RECENT_RECORDS_HEAD}{body}{_TABLE_FOOT}"
+
+# ---------------------------
+# Single-frame dashboard
+# ---------------------------
+# All panels in one document: one stylesheet, one layout pass, and per-panel
+# rows sent as compact JSON. Rows of a panel are only sent when its version
+# changed; the frame keeps the last rows of every panel in sessionStorage.
+
+DASHBOARD_CSS = """
+body {
+    background-color: transparent;
+    color: #e6edf3;
+    font-family: 'Segoe UI', Roboto, sans-serif;
+    margin: 0;
+}
+.dashboard {
+    display: grid;
+    grid-template-columns: repeat(6, 1fr);
+    gap: 1.2em;
+}
+.table-box {
+    background: linear-gradient(145deg, #1a1d25, #11141a);
+    border-radius: 14px;
+    box-shadow: 0 4px 12px rgba(0,0,0,0.5);
+    padding: 1.2em;
+    max-height: 420px;
+    overflow-y: auto;
+}
+.table-box.tall { max-height: none; }
+h3 { margin: 0 0 0.5em 0; font-size: 1.25em; }
+table { width: 100%; border-collapse: collapse; border: none; }
+th {
+    text-align: left;
+    padding: 0.5em;
+    color: #8b949e;
+    font-weight: 700;
+    border-bottom: 1px solid #2d313a;
+    font-size: 0.9em;
+}
+td { padding: 0.6em; border-bottom: 1px solid #2d313a; font-size: 0.95em; }
+tr:hover { background-color: rgba(88,166,255,0.08); transition: background 0.2s ease; }
+.nickname { color: #58a6ff; font-weight: 600; }
+.record { color: #3fb950; font-weight: 600; }
+.rank { color: #f1c40f; font-weight: 600; }
+.stale { color: #8b949e; font-style: italic; }
+.top-1 { background-color: rgba(255,215,0,0.08); font-weight: 900; }
+.top-2 { background-color: rgba(192,192,192,0.08); }
+.top-3 { background-color: rgba(205,127,50,0.08); }
+.score .nickname {
+    position: relative;
+    max-width: 120px;
+    white-space: nowrap;
+    overflow: hidden;
+    text-overflow: ellipsis;
+}
+.score .nickname:hover::after {
+    content: attr(data-login);
+    position: absolute;
+    left: 0;
+    bottom: 100%;
+    background: rgba(30, 34, 45, 0.95);
+    color: #e6edf3;
+    font-size: 0.75em;
+    padding: 4px 8px;
+    border-radius: 6px;
+    white-space: nowrap;
+    box-shadow: 0 2px 6px rgba(0,0,0,0.4);
+}
+.team-badge {
+    display: inline-block;
+    border-radius: 999px;
+    padding: 3px 10px;
+    font-size: 0.8em;
+    font-weight: 600;
+    text-align: center;
+    min-width: 70px;
+    border: 1px solid;
+}
+"""
+
+_DASHBOARD_SCRIPT = """
+const root = document.getElementById("dashboard");
+
+function el(tag, cls, text) {
+    const node = document.createElement(tag);
+    if (cls) node.className = cls;
+    if (text !== undefined && text !== null) node.textContent = text;
+    return node;
+}
+
+function timeAgo(ts) {
+    const s = Date.now() / 1000 - ts;
+    if (s < 60) return Math.floor(s) + " s ago";
+    if (s < 3600) return Math.floor(s / 60) + " min ago";
+    if (s < 86400) return Math.floor(s / 3600) + " h ago";
+    const d = Math.floor(s / 86400);
+    return d + " day" + (d > 1 ? "s" : "") + " ago";
+}
+
+function rowsOf(panel) {
+    const key = "dedicheck:" + panel.id;
+    if (panel.rows !== null) {
+        try { sessionStorage.setItem(key, JSON.stringify({v: panel.v, rows: panel.rows})); } catch (e) {}
+        return panel.rows;
+    }
+    try {
+        const cached = JSON.parse(sessionStorage.getItem(key));
+        if (cached && cached.v === panel.v) return cached.rows;
+    } catch (e) {}
+    return null;
+}
+
+const CELLS = {
+    table: (panel, row, tr) => row.forEach((value, i) =>
+        tr.appendChild(el("td", panel.cols[i] === "NickName" ? "nickname" : "", value))),
+    records: (panel, row, tr) => {
+        tr.appendChild(el("td", "", row[0]));
+        tr.appendChild(el("td", "nickname", row[1]));
+        tr.appendChild(el("td", "record", row[2]));
+        tr.appendChild(el("td", "rank", row[3]));
+        const date = tr.appendChild(el("td", "time-ago", timeAgo(row[4])));
+        date.dataset.ts = row[4];
+    },
+    score: (panel, row, tr) => {
+        // Position, NickName, Login, Team, Color, Points, Maps_Played, Average_Rank
+        tr.appendChild(el("td", "", row[0]));
+        const nick = tr.appendChild(el("td", "nickname", row[1]));
+        nick.dataset.login = "Login: " + row[2];
+        const team = tr.appendChild(el("td"));
+        if (row[3]) {
+            const badge = team.appendChild(el("span", "team-badge", row[3]));
+            badge.style.color = row[4];
+            badge.style.borderColor = row[4];
+        }
+        row.slice(5).forEach(value => tr.appendChild(el("td", "", value)));
+    },
+};
+
+for (const panel of DATA.panels) {
+    const box = root.appendChild(el("div", "table-box " + panel.kind + (panel.tall ? " tall" : "")));
+    box.style.gridColumn = "span " + panel.span;
+    box.appendChild(el("h3", "", panel.title));
+    const rows = rowsOf(panel);
+    if (rows === null) {
+        box.appendChild(el("p", "stale", "Reload the page to refresh this panel."));
+        continue;
+    }
+    const table = box.appendChild(el("table"));
+    const head = table.appendChild(el("thead")).appendChild(el("tr"));
+    panel.headers.forEach(name => head.appendChild(el("th", "", name)));
+    const body = table.appendChild(el("tbody"));
+    rows.forEach((row, i) => {
+        const podium = panel.kind === "score" && i + panel.offset < 3 ? "top-" + (i + panel.offset + 1) : "";
+        CELLS[panel.kind](panel, row, body.appendChild(el("tr", podium)));
+    });
+}
+
+// "x min ago" labels keep moving without any rerun
+setInterval(() => document.querySelectorAll("td.time-ago").forEach(td => {
+    td.textContent = timeAgo(Number(td.dataset.ts));
+}), 30000);
+"""
+
+_DASHBOARD_HEADERS = {
+    "records": ["Challenge", "Nickname", "Record", "Rank", "Set on"],
+    "score": ["Position", "NickName", "Team", "Points", "Maps_Played", "Average_Rank"],
+}
+
+
+def dashboard_panel(panel_id, title, kind, df, version, columns=None, span=6, offset=0):
+    """
+    One panel of render_dashboard, with its rows formatted once per
+    (panel, version).
+
+    Args:
+        kind (str): "table" (the given columns), "records" (latest records)
+                    or "score" (a page of leaderboard.RankIndex).
+        version: anything identifying the panel's data (e.g. snapshot version).
+        span (int): width in sixths of the dashboard.
+        offset (int): rows ranked above a "score" page, for the podium.
+    """
+    rows = cached_fragment((f"dashboard:{panel_id}", version), lambda: _panel_rows(kind, df, columns))
+    return {
+        "id": panel_id, "title": title, "kind": kind, "v": str(version),
+        "headers": columns if kind == "table" else _DASHBOARD_HEADERS[kind],
+        "cols": columns, "span": span, "tall": kind == "score", "offset": offset, "rows": rows,
+    }
+
+
+def _panel_rows(kind, df, columns):
+    if kind == "table":
+        cells = [text_labels(df[col]) for col in columns]
+    elif kind == "records":
+        # Unix seconds; the frame turns them into "x min ago" (naive dates are UTC, as in time_ago)
+        dates = pd.to_datetime(df["RecordDate"])
+        if dates.dt.tz is None:
+            dates = dates.dt.tz_localize("UTC")
+        cells = [
+            text_labels(df["Challenge"]),
+            text_labels(df["NickName"]),
+            fixed_labels(df["Record"]),
+            rank_labels(df["Rank"]),
+            (dates.astype("int64") // 10**9).tolist(),
+        ]
     else:
-        d = int(s // 86400)
-        return f"{d} day{'s' if d > 1 else ''} ago"
+        resolved = default_index().resolve(df["Login"], df["NickName"])
+        cells = [
+            text_labels(df["Position"]),
+            text_labels(df["NickName"]),
+            text_labels(df["Login"]),
+            resolved["team"].astype(object).fillna("").tolist(),
+            resolved["color"].astype(object).fillna("").tolist(),
+            text_labels(df["Points"]),
+            text_labels(df["Maps_Played"]),
+            fixed_labels(df["Average_Rank"]),
+        ]
+    return [list(row) for row in zip(*cells)]
+
+
+def render_dashboard(panels, sent=None):
+    """
+    Every panel (see dashboard_panel) in a single HTML document.
 
-def top_border(df):
+    Args:
+        panels (list): dashboard_panel() dicts, in layout order.
+        sent (dict): panel id -> version this browser session already has;
+                     those panels are sent without rows.
+
+    Returns:
+        (html, versions): the document and the panel versions it carries.
+    """
+    sent = sent or {}
+    payload = [
+        dict(panel, rows=None) if sent.get(panel["id"]) == panel["v"] else panel
+        for panel in panels
+    ]
+    data = json.dumps({"panels": payload}, separators=(",", ":"), ensure_ascii=False)
+    data = data.replace("</", "<\\/")  # keep "</script>" in the data from closing the script
+    html = (
+        f"<html><head><style>{DASHBOARD_CSS}</style></head><body>"
+        f'<div class="dashboard" id="dashboard"></div>'
+        f"<script>const DATA = {data};{_DASHBOARD_SCRIPT}</script>"
+        f"</body></html>"
+    )
+    return html, {panel["id"]: panel["v"] for panel in panels}
+
+def top_border(df, last_updated=None):
     # --- Compute metrics ---
     total_maps = df["MapUID"].nunique()
     unique_players = df["Login"].nunique()
     total_records = len(df)
 
-    # Prefer the global last_updated (from fetcher)
+    # Prefer the time of the last fetch (from the snapshot)
     if last_updated:
-        last_updated_str = _time_ago(last_updated)
+        last_updated_str = time_ago(last_updated)
         pulse_class = "pulse"  # animate if recent
     else:
         last_in_df = pd.to_datetime(df["RecordDate"], errors="coerce").max()
@@ -402,25 +705,6 @@ def top_border(df):
     </div>
     """, unsafe_allow_html=True)
     
-# Helper: human-readable "x time ago"
-def time_ago(dt):
-    if pd.isna(dt):
-        return "N/A"
-    now = datetime.now(timezone.utc) if dt.tzinfo else datetime.utcnow()
-    diff = now - dt
-    s = diff.total_seconds()
-    if s < 60:
-        return f"{int(s)} s ago"
-    elif s < 3600:
-        return f"{int(s // 60)} min ago"
-    elif s < 86400:
-        return f"{int(s // 3600)} h ago"
-    else:
-        days = int(s // 86400)
-        return f"{days} day{'s' if days > 1 else ''} ago"
-
-
-
 def render_teams_table(df):
     """Return a compact, styled HTML leaderboard with colored teams and progress bars."""
     style = """
@@ -495,6 +779,8 @@ def render_teams_table(df):
 
     html = "<div class='score-container'><table class='score-table'><thead><tr><th>Team</th><th style='text-align:right;'>Score</th></tr></thead><tbody>"
 
+    colors = pd.Series(default_index().colors_of(df["team"])).astype(object).fillna("#58a6ff").tolist()
+
     for i, row in enumerate(df.itertuples(index=False)):
         team = str(row.team)
         score = float(row.Score)
@@ -510,12 +796,7 @@ def render_teams_table(df):
         else:
             row_class = ""
 
-        # team color
-        color = "#58a6ff"
-        for key, hex_color in TEAM_COLORS.items():
-            if key.lower() in team.lower():
-                color = hex_color
-                break
+        color = colors[i]
 
         html += f"""
         <tr class="{row_class}">
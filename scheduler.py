@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Activity-aware refresh scheduler for the Dedimania maps.
+
+Every map UID has its own deadline. Maps with many records in the last days
+(the signal behind the "Most Active Maps (Last 7 Days)" panel) get a larger
+share of a fixed hourly request budget, cold maps a smaller one, so hot maps
+refresh within minutes while the total request volume stays flat.
+"""
+import heapq
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+
+def map_activity(df, days=7):
+    """Number of records set in the last `days` days, per MapUID."""
+    if df is None or df.empty:
+        return pd.Series(dtype="int64")
+    since = datetime.now() - timedelta(days=days)
+    dates = pd.to_datetime(df["RecordDate"], errors="coerce")
+    return df.loc[dates >= since, "MapUID"].value_counts()
+
+
+class RefreshScheduler:
+    """
+    Per-UID deadline queue with activity-weighted intervals, jitter,
+    exponential backoff on failures and a global hourly request budget.
+
+    Args:
+        fetch: callable taking a list of UIDs and returning the merged records
+            DataFrame (with df.attrs["failed_uids"]), e.g. dedi.fetch_dedi(uids=...).
+        load_uids: callable returning the current list of map UIDs.
+        on_snapshot: callable receiving each DataFrame returned by `fetch`.
+        budget_per_hour: requests allowed per hour (default: one per map).
+        min_interval / max_interval: bounds on a map's refresh interval (s).
+        activity_days: window of the activity signal.
+        jitter: relative +/- randomisation applied to every interval.
+        backoff_base / max_backoff: retry delay after 1 failure and its cap (s).
+        coalesce: maps due within this many seconds are fetched in the same batch.
+    """
+
+    def __init__(self, fetch, load_uids, on_snapshot=None, budget_per_hour=None,
+                 min_interval=300, max_interval=6 * 3600, activity_days=7,
+                 jitter=0.1, backoff_base=60, max_backoff=3600, coalesce=30):
+        self.fetch = fetch
+        self.load_uids = load_uids
+        self.on_snapshot = on_snapshot
+        self.budget_per_hour = budget_per_hour
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.activity_days = activity_days
+        self.jitter = jitter
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.coalesce = coalesce
+
+        self.uids = []
+        self.intervals = {}
+        self.failures = {}
+        self._deadlines = {}
+        self._heap = []
+        self._tokens = None
+        self._last_refill = time.monotonic()
+
+    # ---------------------------
+    # Budget
+    # ---------------------------
+    def _budget(self):
+        return self.budget_per_hour or max(len(self.uids), 1)
+
+    def _refill(self, now):
+        budget = self._budget()
+        if self._tokens is None:
+            self._tokens = float(budget)  # first full pass fits in one hour of budget
+        self._tokens = min(float(budget), self._tokens + (now - self._last_refill) * budget / 3600)
+        self._last_refill = now
+
+    # ---------------------------
+    # Deadlines
+    # ---------------------------
+    def _set_deadline(self, uid, deadline):
+        self._deadlines[uid] = deadline
+        heapq.heappush(self._heap, (deadline, uid))
+
+    def _jittered(self, seconds):
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def sync_uids(self, now=None):
+        """Pick up maps added to / removed from the UID list; new maps are due now."""
+        now = time.monotonic() if now is None else now
+        uids = self.load_uids()
+        for uid in uids:
+            if uid not in self._deadlines:
+                self._set_deadline(uid, now)
+        for uid in set(self._deadlines) - set(uids):
+            del self._deadlines[uid]
+            self.intervals.pop(uid, None)
+            self.failures.pop(uid, None)
+        self.uids = uids
+
+    def update_intervals(self, df):
+        """
+        Split the hourly budget between maps in proportion to 1 + their recent
+        activity, and turn each share into a refresh interval.
+        """
+        activity = map_activity(df, self.activity_days).reindex(self.uids, fill_value=0)
+        weights = activity + 1
+        per_hour = self._budget() * weights / weights.sum()
+        intervals = (3600 / per_hour).clip(self.min_interval, self.max_interval)
+        self.intervals = intervals.to_dict()
+
+    def due(self, now=None):
+        """Pop the maps due now (or within `coalesce` s), limited by the remaining budget."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        batch = []
+        while self._heap and self._heap[0][0] <= now + self.coalesce and len(batch) < int(self._tokens):
+            deadline, uid = heapq.heappop(self._heap)
+            if self._deadlines.get(uid) != deadline:
+                continue  # stale heap entry
+            del self._deadlines[uid]
+            batch.append(uid)
+        self._tokens -= len(batch)
+        return batch
+
+    def reschedule(self, uids, failed, now=None):
+        now = time.monotonic() if now is None else now
+        failed = set(failed)
+        known = set(self.uids)
+        for uid in uids:
+            if uid not in known:
+                continue
+            if uid in failed:
+                self.failures[uid] = self.failures.get(uid, 0) + 1
+                delay = min(self.max_backoff, self.backoff_base * 2 ** (self.failures[uid] - 1))
+            else:
+                self.failures.pop(uid, None)
+                delay = self.intervals.get(uid, self.max_interval)
+            self._set_deadline(uid, now + self._jittered(delay))
+
+    def next_wakeup(self, now=None, max_sleep=60):
+        """Seconds until the next deadline or the next budget token, capped at max_sleep."""
+        now = time.monotonic() if now is None else now
+        while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        wait = max_sleep
+        if self._heap:
+            wait = min(wait, self._heap[0][0] - now)
+        if self._tokens is not None and self._tokens < 1:
+            wait = max(wait, (1 - self._tokens) * 3600 / self._budget())
+        return max(1.0, min(wait, max_sleep))
+
+    # ---------------------------
+    # Loop
+    # ---------------------------
+    def run_once(self):
+        """Fetch every map that is due and reschedule it. Returns the batch size."""
+        self.sync_uids()
+        batch = self.due()
+        if not batch:
+            return 0
+
+        print(f"⏳ Refreshing {len(batch)} due maps ({int(self._tokens)} requests left in budget)...")
+        try:
+            df = self.fetch(batch)
+            failed = df.attrs.get("failed_uids", [])
+        except Exception as e:
+            print(f"⚠️ Error during fetch: {e}")
+            df, failed = None, batch
+
+        if df is not None:
+            self.update_intervals(df)
+            if self.on_snapshot is not None:
+                try:
+                    self.on_snapshot(df)
+                except Exception as e:
+                    print(f"⚠️ Error publishing snapshot: {e}")
+        self.reschedule(batch, failed)
+        sys.stdout.flush()
+        return len(batch)
+
+    def run(self):
+        while True:
+            self.run_once()
+            time.sleep(self.next_wakeup())
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Canonical in-memory layout of the Dedimania records frame.
+
+Repeated strings (players, maps, game mode...) are stored as categoricals,
+i.e. one small int code per row plus a single copy of each distinct value,
+and records/ranks are plain numeric arrays. Group by categorical columns
+with observed=True so only existing combinations are produced.
+"""
+import pandas as pd
+
+COLUMNS = [
+    "Game", "Login", "NickName", "Rank", "Max", "Record", "Mode",
+    "CPs", "MapCPs", "Challenge", "Envir", "RecordDate", "MapUID",
+]
+CATEGORICAL_COLUMNS = ["Game", "Login", "NickName", "Mode", "MapCPs", "Challenge", "Envir", "MapUID"]
+NUMERIC_DTYPES = {
+    "Rank": "float32",
+    "Max": "float32",
+    "CPs": "float32",
+    "Record": "float64",
+}
+
+
+def canonicalize(df):
+    """Return `df` with the canonical column order and dtypes."""
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if col in CATEGORICAL_COLUMNS:
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype("category")
+        elif col in NUMERIC_DTYPES:
+            values = pd.to_numeric(values, errors="coerce").astype(NUMERIC_DTYPES[col])
+        elif col == "RecordDate" and not pd.api.types.is_datetime64_any_dtype(values):
+            values = pd.to_datetime(values, errors="coerce")
+        columns[col] = values
+    ordered = [c for c in COLUMNS if c in columns] + [c for c in columns if c not in COLUMNS]
+    out = pd.DataFrame({c: columns[c] for c in ordered}, index=df.index)
+    out.attrs = dict(df.attrs)
+    return out
+
@@ -5,55 +5,81 @@ Created on Tue Oct  7 09:42:17 2025
 @author: Hola
 """
 
+import numpy as np
 import pandas as pd
-# Points system based on rank
+from team_index import TEAM_COLORS, default_index
+
+# Points system based on rank: (first rank, last rank, points); other ranks score 0
+POINTS_TABLE = [
+    (1, 1, 10),
+    (2, 2, 7),
+    (3, 3, 4),
+    (4, 10, 3),
+    (11, 20, 2),
+    (21, 30, 1),
+]
+
+def points_lookup(table=POINTS_TABLE):
+    """Array whose index is a rank and value its points; the last slot (0) is for unscored ranks."""
+    lookup = np.zeros(max(last for _, last, _ in table) + 2, dtype=np.int64)
+    for first, last, points in table:
+        lookup[first:last + 1] = points
+    return lookup
+
+def rank_points(ranks, table=POINTS_TABLE):
+    """Points of every rank in `ranks` (Series in, Series out) through one lookup."""
+    lookup = points_lookup(table)
+    values = np.asarray(ranks, dtype="float64")
+    in_table = np.isfinite(values) & (values >= 0) & (values < len(lookup) - 1)
+    points = lookup[np.where(in_table, values, len(lookup) - 1).astype(np.int64)]
+    if isinstance(ranks, pd.Series):
+        return pd.Series(points, index=ranks.index, name="Points")
+    return points
+
 def assign_points(rank):
-    if rank == 1:
-        return 10
-    elif rank == 2:
-        return 7
-    elif rank == 3:
-        return 4
-    elif 4 <= rank <= 10:
-        return 3
-    elif 11 <= rank <= 20:
-        return 2
-    elif 21 <= rank <= 30:
-        return 1
-    else:
-        return 0  # Rank > 30
-def scoring_function(df):
-    
-    # Apply the function to assign points based on the rank
-    df['Points'] = df['Rank'].apply(assign_points)
-
-    # Number of maps played: count unique 'Challenge' for each player
-    df['Maps Played'] = df.groupby(['Login', 'NickName'])['Challenge'].transform('nunique')
-
-    # Average rank on scoring maps: only include players that have a valid rank
-    df['Average Rank'] = df.groupby(['Login', 'NickName'])['Rank'].transform('mean')
-
-    # Group by player and aggregate
-    score_df = df.groupby(['Login', 'NickName']).agg(
-        Points=('Points', 'sum'),
-        Maps_Played=('Maps Played', 'max'),
-        Average_Rank=('Average Rank', 'mean')
-    ).reset_index()
-    
+    return int(rank_points([rank])[0])
+
+def scoring_function(df, schemes=None):
+    """
+    Per player (Login, NickName): Points, Maps_Played and Average_Rank, in one
+    grouped pass and without modifying `df`.
+
+    Args:
+        df (pd.DataFrame): Records with Login, NickName, Challenge and Rank.
+        schemes (dict): Optional {name: points table}; adds one Points_<name>
+                        column per scheme to compare rules side by side.
+    """
+    work = pd.DataFrame({
+        "Login": df["Login"],
+        "NickName": df["NickName"],
+        "Challenge": df["Challenge"],
+        "Rank": df["Rank"],
+        "Points": rank_points(df["Rank"]),
+    })
+    aggregations = {
+        "Points": ("Points", "sum"),
+        "Maps_Played": ("Challenge", "nunique"),
+        "Average_Rank": ("Rank", "mean"),
+    }
+    for name, table in (schemes or {}).items():
+        work[f"Points_{name}"] = rank_points(df["Rank"], table)
+        aggregations[f"Points_{name}"] = (f"Points_{name}", "sum")
+
+    score_df = work.groupby(["Login", "NickName"], observed=True).agg(**aggregations).reset_index()
     return(score_df)
 
-team_prefixes = [
-    "ĊĦ »", "ѕнιғт", "LeG", "нот", "Јғғ", "Сяс", "הѕс", "»тят",
-    "νѕρ", "ғฟ๏", "ѕωα", "Law", "4W : : ", "nsc", "»ЯтА",
-    "ωаѕρ .", "ғаιהτ.", "sigN", "GC l|", "kings"
-]
+def daily_scores(df):
+    """Total points and latest nickname of every player (login, nickname, score), as in player_daily_scores."""
+    return (
+        df.assign(score=rank_points(df["Rank"]))
+        .sort_values("RecordDate")
+        .groupby("Login", as_index=False, observed=True)
+        .agg(nickname=("NickName", "last"), score=("score", "sum"))
+        .rename(columns={"Login": "login"})
+    )
 
-def assign_team_from_nickname(nickname):
-    if pd.isna(nickname):
-        return None
-    nickname = nickname.strip()
-    for prefix in team_prefixes:
-        if nickname.lower().startswith(prefix.lower()):
-            return prefix.strip()
-    return None
+team_prefixes = list(TEAM_COLORS)
 
+def assign_team_from_nickname(nickname):
+    """Team tag `nickname` starts with (see team_index for whole columns)."""
+    return default_index().match(nickname)
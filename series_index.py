@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Per-player score time series for the progression page.
+
+Built once per daily sync from the local daily_points store: every row is
+sorted by login then day, joined with its team and carries its day-over-day
+delta. The index is saved as an uncompressed Arrow file and memory-mapped by
+readers, who keep only the row offsets of every login and the logins of
+every team, so selecting players and a date range is a handful of slices.
+"""
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from daily_updater import POINTS_DIR, load_points, sync_version
+
+SERIES_PATH = os.path.join(POINTS_DIR, "series.arrow")
+TEAMS_PATH = "./resources/teams.csv"
+NO_TEAM = "No team"
+
+_TEXT = pa.dictionary(pa.int32(), pa.string())
+SCHEMA = pa.schema([
+    ("login", _TEXT), ("nickname", _TEXT), ("score", pa.float64()),
+    ("recorded_at", pa.timestamp("ns")), ("diff", pa.float64()), ("Team", _TEXT),
+])
+
+
+def build_series_index(path=SERIES_PATH, teams_path=TEAMS_PATH):
+    """Rebuild the index file from every synced day."""
+    df = load_points()
+    df = df.sort_values(["login", "recorded_at"], kind="stable").reset_index(drop=True)
+
+    # Delta to the player's previous day: one shifted difference, reset at each login
+    diff = df["score"].diff()
+    diff[df["login"].ne(df["login"].shift())] = np.nan
+    df["diff"] = diff
+
+    teams = _login_teams(teams_path)
+    df["Team"] = df["login"].map(teams).fillna(NO_TEAM)
+    for col in ["login", "nickname", "Team"]:
+        df[col] = pd.Categorical(df[col], categories=sorted(df[col].dropna().unique()))
+
+    table = pa.Table.from_pandas(df[SCHEMA.names], schema=SCHEMA, preserve_index=False).combine_chunks()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def open_series_index(path=SERIES_PATH, teams_path=TEAMS_PATH):
+    """SeriesIndex of the latest sync, rebuilding the file first when it is stale."""
+    built = os.stat(path).st_mtime_ns if os.path.exists(path) else -1
+    teams_changed = os.path.exists(teams_path) and os.stat(teams_path).st_mtime_ns > built
+    if built < sync_version() or teams_changed:
+        build_series_index(path, teams_path)
+    return SeriesIndex(pa.ipc.open_file(pa.memory_map(path, "r")).read_all())
+
+
+def index_version(teams_path=TEAMS_PATH):
+    """Cache key of the index: changes with every sync and every teams.csv edit."""
+    teams = os.stat(teams_path).st_mtime_ns if os.path.exists(teams_path) else None
+    return sync_version(), teams
+
+
+class SeriesIndex:
+    """
+    Args:
+        table (pa.Table): rows sorted by login then day, as written by build_series_index.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._logins = table.column("login").combine_chunks()
+        self._nicknames = table.column("nickname").combine_chunks()
+        self._teams = table.column("Team").combine_chunks()
+        self._days = table.column("recorded_at").combine_chunks().cast(pa.timestamp("ns")).to_numpy().view("int64")
+
+        # Rows of every login: codes are sorted, so each login is one contiguous block
+        codes = self._logins.indices.to_numpy(zero_copy_only=False)
+        names = self._logins.dictionary.to_pylist()
+        bounds = np.searchsorted(codes, np.arange(len(names) + 1))
+        self.offsets = {login: (bounds[i], bounds[i + 1]) for i, login in enumerate(names)}
+
+        # Logins of every team, and the roster (latest nickname and team per login)
+        last = bounds[1:][bounds[1:] > bounds[:-1]] - 1
+        self.players = pd.DataFrame({
+            "login": self._logins.take(pa.array(last)).to_pandas(),
+            "nickname": self._nicknames.take(pa.array(last)).to_pandas(),
+            "Team": self._teams.take(pa.array(last)).to_pandas(),
+        })
+        self.team_logins = {
+            team: set(rows["login"]) for team, rows in self.players.groupby("Team", observed=True)
+        }
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def date_range(self):
+        """(first, last) day in the index, as Timestamps."""
+        if not len(self):
+            return None, None
+        return pd.Timestamp(self._days.min()), pd.Timestamp(self._days.max())
+
+    def rows(self, logins, start=None, end=None):
+        """Row numbers of `logins` between `start` and `end` (inclusive)."""
+        low = pd.Timestamp(start).value if start is not None else np.iinfo(np.int64).min
+        high = pd.Timestamp(end).value if end is not None else np.iinfo(np.int64).max
+        parts = []
+        for login in sorted(logins):
+            if login not in self.offsets:
+                continue
+            first, stop = self.offsets[login]
+            days = self._days[first:stop]
+            parts.append(np.arange(
+                first + np.searchsorted(days, low, side="left"),
+                first + np.searchsorted(days, high, side="right"),
+            ))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def select(self, logins, start=None, end=None):
+        """
+        Series of `logins` between `start` and `end`: login, nickname, score,
+        recorded_at, diff (NaN on a player's first day), Team and display_label.
+        """
+        df = self.table.take(pa.array(self.rows(logins, start, end))).to_pandas()
+        labels = df["nickname"].astype(str) + " (" + df["login"].astype(str) + ")"
+        df["display_label"] = labels.astype("category")
+        return df
+
+
+def _login_teams(path=TEAMS_PATH):
+    if not os.path.exists(path):
+        return {}
+    teams = pd.read_csv(path, sep="\t", engine="python")
+    teams = teams.dropna(subset=["Login", "Team"]).drop_duplicates("Login")
+    return dict(zip(teams["Login"], teams["Team"]))
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Snapshots published across processes through a memory-mapped file.
+
+worker.py writes every snapshot it publishes to SHARED_PATH; any number of
+Streamlit (or other) processes attach to it read-only and only poll its
+header, so crawling and rendering never share a process or the GIL.
+
+File layout (little-endian):
+
+    header     magic b"DEDISNAP", format u32, snapshot version u64, directory length u64
+    directory  JSON: timestamps, panel content versions and, for every table
+               (the records frame and each panel), its [offset, length]
+    tables     Arrow IPC streams, each starting on a 64-byte boundary
+
+A new file is written next to the old one and renamed into place, so readers
+see either the previous or the next snapshot, never a partial one; mappings
+already open stay valid until their reader moves on.
+
+Readers keep the tables as Arrow tables over the mapping. The records frame
+is converted once per snapshot (every page reads it; numeric columns without
+nulls stay zero-copy), each panel only when a page first asks for it.
+"""
+import json
+import os
+import struct
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime
+import pyarrow as pa
+from snapshot import Snapshot, content_version
+from panels import DERIVED_PANELS, derive_panels
+
+SHARED_PATH = os.getenv("DEDI_SHARED_SNAPSHOT", "./resources/snapshot.arrows")
+
+MAGIC = b"DEDISNAP"
+FORMAT = 1
+_HEADER = struct.Struct("<8sIQQ")
+_ALIGN = 64
+_FRAME = "__frame__"  # table name of the records frame
+REPLACE_ATTEMPTS = 10  # Windows refuses to replace a file readers still map
+REPLACE_DELAY = 0.2
+
+
+def write_shared(snapshot, path=SHARED_PATH):
+    """Atomically replace the shared file at `path` with `snapshot`."""
+    tables = {_FRAME: snapshot.frame}
+    for name, panel in snapshot.panels.items():
+        if name not in DERIVED_PANELS:  # rebuilt by readers
+            tables[name] = panel
+
+    blobs = {name: _ipc_bytes(frame) for name, frame in tables.items()}
+    directory = {
+        "published_at": snapshot.published_at.isoformat(),
+        "fetched_at": snapshot.fetched_at.isoformat() if snapshot.fetched_at else None,
+        "panel_versions": snapshot.panel_versions,
+        "tables": {},
+    }
+    # Offsets depend on the directory length: size it with relative offsets,
+    # leaving room for every offset to grow to 20 digits
+    offset = 0
+    for name, blob in blobs.items():
+        directory["tables"][name] = [offset, len(blob)]
+        offset = _aligned(offset + len(blob))
+    start = _aligned(_HEADER.size + len(json.dumps(directory).encode()) + 20 * len(blobs))
+    for name in blobs:
+        directory["tables"][name][0] += start
+    encoded = json.dumps(directory).encode().ljust(start - _HEADER.size)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT, snapshot.version, len(encoded)))
+        f.write(encoded)
+        for name, blob in blobs.items():
+            f.seek(directory["tables"][name][0])
+            f.write(blob)
+    _replace(tmp_path, path)
+
+
+def read_version(path=SHARED_PATH):
+    """Snapshot version in the header of `path` (0 when nothing is published yet)."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+    except FileNotFoundError:
+        return 0
+    if len(header) < _HEADER.size:
+        return 0
+    magic, fmt, version, _ = _HEADER.unpack(header)
+    if magic != MAGIC or fmt != FORMAT:
+        raise ValueError(f"{path} is not a shared snapshot (format {FORMAT})")
+    return version
+
+
+def read_shared(path=SHARED_PATH):
+    """Map `path` and return its Snapshot; Arrow buffers point into the mapping."""
+    source = pa.memory_map(path, "r")
+    buffer = source.read_buffer()
+    magic, fmt, version, length = _HEADER.unpack(buffer[:_HEADER.size].to_pybytes())
+    if magic != MAGIC or fmt != FORMAT:
+        raise ValueError(f"{path} is not a shared snapshot (format {FORMAT})")
+    directory = json.loads(buffer[_HEADER.size:_HEADER.size + length].to_pybytes())
+
+    tables = {}
+    for name, (offset, size) in directory["tables"].items():
+        tables[name] = pa.ipc.open_stream(buffer.slice(offset, size)).read_all()
+    frame = _to_pandas(tables.pop(_FRAME))
+
+    fetched_at = directory["fetched_at"]
+    return Snapshot(
+        version,
+        frame,
+        datetime.fromisoformat(directory["published_at"]),
+        datetime.fromisoformat(fetched_at) if fetched_at else None,
+        MappedPanels(frame, tables),
+        directory["panel_versions"],
+    )
+
+
+class MappedPanels(Mapping):
+    """
+    Panels of a mapped snapshot, converted to pandas on first access. The
+    derived panels are all built together the first time one is asked for.
+
+    Args:
+        frame (pd.DataFrame): records frame of the snapshot.
+        tables (dict): panel name -> pa.Table read from the mapping.
+    """
+
+    def __init__(self, frame, tables):
+        self._frame = frame
+        self._tables = tables
+        self._panels = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        panel = self._panels.get(name)
+        if panel is not None:
+            return panel
+        if name not in self._tables and name not in DERIVED_PANELS:
+            raise KeyError(name)
+        with self._lock:
+            if name not in self._panels:
+                if name in DERIVED_PANELS:
+                    derived = derive_panels(self._frame, {"solo_leaderboard": self._convert("solo_leaderboard")})
+                    for key in DERIVED_PANELS:
+                        self._panels[key] = derived[key]
+                else:
+                    self._convert(name)
+            return self._panels[name]
+
+    def __iter__(self):
+        yield from self._tables
+        yield from DERIVED_PANELS
+
+    def __len__(self):
+        return len(self._tables) + len(DERIVED_PANELS)
+
+    def _convert(self, name):
+        if name not in self._panels:
+            self._panels[name] = _to_pandas(self._tables[name])
+        return self._panels[name]
+
+
+class SharedSnapshots:
+    """
+    Read-only stand-in for snapshot.SnapshotHolder, following the file a
+    worker publishes to. A new snapshot is only mapped once its version
+    shows up in the header.
+    """
+
+    def __init__(self, path=SHARED_PATH):
+        self.path = path
+        self._current = None
+        self._fallback = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        current = self._current
+        version = read_version(self.path)
+        if version and (current is None or version != current.version):
+            with self._lock:
+                if self._current is None or self._current.version != version:
+                    self._current = read_shared(self.path)
+                current = self._current
+        return current
+
+    @property
+    def version(self):
+        return read_version(self.path)
+
+    def publish_if_empty(self, load):
+        """Current shared snapshot; until the worker published one, `load` it locally."""
+        current = self.current()
+        if current is not None:
+            return current
+        with self._lock:
+            if self._fallback is None:
+                # Version 0, like the empty header, so pollers wait for the worker's first one
+                frame, panels = load()
+                versions = {name: content_version(value) for name, value in panels.items()}
+                self._fallback = Snapshot(0, frame, datetime.utcnow(), None, panels, versions)
+            return self._fallback
+
+
+def _ipc_bytes(frame):
+    table = pa.Table.from_pandas(frame)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _to_pandas(table):
+    # One block per column, so numeric columns without nulls keep pointing into the mapping
+    return table.to_pandas(split_blocks=True)
+
+
+def _replace(tmp_path, path):
+    for attempt in range(REPLACE_ATTEMPTS):
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            if attempt == REPLACE_ATTEMPTS - 1:
+                raise
+            time.sleep(REPLACE_DELAY)
+
+
+def _aligned(offset):
+    return -(-offset // _ALIGN) * _ALIGN
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Versioned, read-only record snapshots shared by every Streamlit session.
+
+The fetch thread publishes each new frame by swapping a single reference, so
+readers always see one complete snapshot and never a frame being rebuilt.
+Sessions get copy-on-write views of the published frame: nothing is copied
+unless a session modifies its view, and then only that session pays for it.
+Copy-on-write is a pandas option set by the entry points (app.py, worker.py);
+without it, views are deep copies.
+"""
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: int
+    frame: pd.DataFrame = field(repr=False)
+    published_at: datetime
+    fetched_at: Optional[datetime] = None  # None when loaded from disk
+    panels: dict = field(default_factory=dict, repr=False)  # precomputed dashboard frames
+    panel_versions: dict = field(default_factory=dict)  # panel name -> content hash
+
+    def view(self):
+        """Frame a session may modify: a zero-copy view under copy-on-write, else a deep copy."""
+        return self.frame.copy(deep=pd.get_option("mode.copy_on_write") is not True)
+
+
+class SnapshotHolder:
+    def __init__(self):
+        self._current = None
+        self._base_version = 0  # version before the first publish
+        self._lock = threading.Lock()
+
+    def current(self):
+        return self._current
+
+    @property
+    def version(self):
+        current = self._current
+        return current.version if current is not None else self._base_version
+
+    def continue_from(self, version):
+        """Number the next snapshots after `version`, e.g. one an earlier process published."""
+        with self._lock:
+            self._base_version = max(self._base_version, version)
+
+    def publish(self, df, fetched_at=None, panels=None):
+        """Publish `df` (and its panels) as the next version and return its Snapshot."""
+        with self._lock:
+            return self._swap(df, fetched_at, panels)
+
+    def publish_if_empty(self, load):
+        """
+        Publish the (frame, panels) returned by load() unless a snapshot already
+        exists; return the current one.
+        """
+        with self._lock:
+            if self._current is None:
+                frame, panels = load()
+                self._swap(frame, None, panels)
+            return self._current
+
+    def _swap(self, df, fetched_at, panels):
+        frame = df.copy(deep=False)  # detach from the caller's object
+        panels = panels or {}
+        versions = {name: content_version(value) for name, value in panels.items()}
+        snapshot = Snapshot(self.version + 1, frame, datetime.utcnow(), fetched_at, panels, versions)
+        self._current = snapshot
+        return snapshot
+
+
+def content_version(value):
+    """
+    Short hash of a panel's content: equal across snapshots while the panel
+    is unchanged, so renderers can key caches and refreshes on it.
+    """
+    frame = getattr(value, "frame", value)  # e.g. leaderboard.RankIndex
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(",".join(map(str, frame.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Typed columnar snapshot of the Dedimania records.
+
+Snapshots are Parquet files with dictionary-encoded string columns and
+native timestamp columns, written to a temporary file and renamed into place
+so readers never see a half-written snapshot. CSV is only an export format.
+"""
+import os
+import sys
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+SNAPSHOT_PATH = "./resources/dedimania_all_records.parquet"
+CSV_PATH = "./resources/dedimania_all_records.csv"
+
+STRING_COLUMNS = ["Game", "Login", "NickName", "Mode", "MapCPs", "Challenge", "Envir", "MapUID"]
+NUMERIC_COLUMNS = ["Rank", "Max", "Record", "CPs"]
+DATE_COLUMNS = ["RecordDate"]
+
+
+def write_snapshot(df, path=SNAPSHOT_PATH):
+    """Atomically replace the snapshot at `path` with `df`."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(
+        table,
+        tmp_path,
+        use_dictionary=[c for c in STRING_COLUMNS if c in df.columns],
+        coerce_timestamps="ms",
+        allow_truncated_timestamps=True,
+        compression="zstd",
+    )
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path=SNAPSHOT_PATH):
+    """Memory-map a snapshot written by write_snapshot; no type coercion needed."""
+    return pq.read_table(path, memory_map=True).to_pandas(coerce_temporal_nanoseconds=True)
+
+
+def load_snapshot(path=SNAPSHOT_PATH, csv_path=CSV_PATH):
+    """
+    Load the latest snapshot, falling back to the CSV export (e.g. the seed
+    file shipped in resources/) when no snapshot has been written yet.
+    """
+    if os.path.exists(path):
+        return read_snapshot(path)
+    return read_csv_export(csv_path)
+
+
+def export_csv(df, path=CSV_PATH):
+    df.to_csv(path, index=False, encoding="utf-8")
+
+
+def read_csv_export(path=CSV_PATH):
+    """Read a CSV export back with the snapshot column types."""
+    df = pd.read_csv(path)
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce", format="ISO8601")
+    return df
+
+
+if __name__ == "__main__":
+    # Export the current snapshot as CSV: python store.py [out.csv]
+    out = sys.argv[1] if len(sys.argv) > 1 else CSV_PATH
+    snapshot = load_snapshot()
+    export_csv(snapshot, out)
+    print(f"💾 Exported {len(snapshot)} records to {out}")
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Team resolution for whole columns.
+
+A player's team comes from the login mapping in teams.csv when the login is
+listed there, otherwise from the tag the nickname starts with. Tags are matched
+with a character trie over normalized text, so resolving a nickname costs
+its length whatever the number of teams, and every distinct nickname/login
+of a column is resolved only once.
+
+Normalization makes lookalike tags match consistently: NFKC, casefold,
+accents dropped, common Cyrillic/Greek homoglyphs folded to Latin and
+whitespace runs collapsed ("ЅωΑ", "ѕωα" and "sωa" are the same tag).
+"""
+import unicodedata
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+TEAMS_PATH = "./resources/teams.csv"
+SOLO = "soloplayer"  # listed in teams.csv without a team
+
+# Known team tags (as they appear in nicknames) and their colors
+TEAM_COLORS = {
+    "ĊĦ »": "#1f77b4",   # Blue
+    "ѕнιғт": "#ff7f0e",  # Orange
+    "LeG": "#2ca02c",    # Green
+    "нот": "#d62728",    # Red
+    "Јғғ": "#9467bd",    # Purple
+    "Сяс": "#8c564b",    # Brown
+    "הѕс": "#e377c2",    # Pink
+    "»тят": "#7f7f7f",   # Gray
+    "νѕρ": "#bcbd22",    # Yellow-green
+    "ғฟ๏": "#17becf",    # Teal
+    "ѕωα": "#1a55FF",    # Strong Blue
+    "Law": "#FF1493",    # Deep Pink
+    "4W : : ": "#FFD700",# Gold
+    "nsc": "#A52A2A",    # Dark Red
+    "»ЯтА": "#228B22",   # Forest Green
+    "ωаѕρ .": "#DAA520", # Goldenrod
+    "ғаιהτ.": "#00CED1", # Dark Turquoise
+    "sigN": "#DC143C",   # Crimson
+    "GC l|": "#4682B4",  # Steel Blue
+    "kings": "#800000",  # Maroon
+}
+
+# Cyrillic/Greek letters drawn like Latin ones (lowercase, after casefold)
+_HOMOGLYPHS = str.maketrans({
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h",
+    "о": "o", "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "ѕ": "s",
+    "і": "i", "ї": "i", "ј": "j", "ԁ": "d", "һ": "h", "ԛ": "q", "ԝ": "w",
+    "α": "a", "β": "b", "ε": "e", "ι": "i", "κ": "k", "ν": "v", "ο": "o",
+    "ρ": "p", "τ": "t", "υ": "u", "χ": "x",
+})
+
+
+def normalize_tag(text):
+    """Comparison key of a nickname or tag (see module docstring)."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = "".join(c for c in unicodedata.normalize("NFD", text) if not unicodedata.combining(c))
+    text = text.translate(_HOMOGLYPHS)
+    return " ".join(text.split())
+
+
+class TeamIndex:
+    """
+    Args:
+        tags (dict): tag -> color; nicknames starting with a tag belong to it.
+        login_teams (dict): login -> team (teams.csv); blank teams mean SOLO.
+    """
+
+    def __init__(self, tags=None, login_teams=None):
+        tags = TEAM_COLORS if tags is None else tags
+        self._trie = {}
+        self.colors = {}
+        names = []
+        for tag, color in tags.items():
+            name = tag.strip()
+            key = normalize_tag(tag)
+            if not key:
+                continue
+            node = self._trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node.setdefault(None, name)  # first registered tag wins on a collision
+            names.append(node[None])
+            self.colors.setdefault(key, color)
+
+        self.login_teams = {}
+        for login, team in (login_teams or {}).items():
+            if pd.isna(login):
+                continue
+            team = SOLO if pd.isna(team) or not str(team).strip() else str(team).strip()
+            self.login_teams.setdefault(str(login).strip().lower(), team)
+
+        teams = names + sorted(set(self.login_teams.values()))
+        self.team_dtype = pd.CategoricalDtype(list(dict.fromkeys(teams)))
+        self.color_dtype = pd.CategoricalDtype(list(dict.fromkeys(self.colors.values())))
+
+    # ---------------------------
+    # Scalars
+    # ---------------------------
+    def match(self, nickname):
+        """Longest known tag `nickname` starts with, or None."""
+        if not isinstance(nickname, str):
+            return None
+        node, found = self._trie, None
+        for char in normalize_tag(nickname):
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(None, found)
+        return found
+
+    def color(self, team):
+        """Color of a team name (matched like a nickname), or None."""
+        if not isinstance(team, str):
+            return None
+        tag = self.match(team)
+        return self.colors.get(normalize_tag(tag)) if tag is not None else None
+
+    def listed_team(self, login):
+        """Team of `login` in teams.csv (SOLO when listed without one), or None."""
+        if not isinstance(login, str):
+            return None
+        return self.login_teams.get(login.strip().lower())
+
+    def team(self, login, nickname=None):
+        team = self.listed_team(login)
+        return team if team is not None else self.match(nickname)
+
+    # ---------------------------
+    # Columns
+    # ---------------------------
+    def match_nicknames(self, nicknames):
+        """Tag of every nickname, as a Categorical."""
+        return _per_unique(nicknames, self.match, self.team_dtype)
+
+    def colors_of(self, teams):
+        """Color of every team name, as a Categorical (NaN when unknown)."""
+        return _per_unique(teams, self.color, self.color_dtype)
+
+    def resolve(self, logins, nicknames=None):
+        """
+        Team and color of every (login, nickname) row: teams.csv first, then
+        the nickname tag. Returns a DataFrame of two categorical columns.
+        """
+        logins = pd.Series(logins)
+        team = _per_unique(logins, self.listed_team, self.team_dtype)
+        if nicknames is not None:
+            # Unlisted logins fall back on the nickname tag, each resolved once
+            tags = self.match_nicknames(nicknames)
+            team = pd.Categorical.from_codes(
+                np.where(team.codes >= 0, team.codes, tags.codes), dtype=self.team_dtype
+            )
+        return pd.DataFrame({"team": team, "color": self.colors_of(team)}, index=logins.index)
+
+
+def _per_unique(values, func, dtype):
+    """func() of every value, as a Categorical of `dtype`; one call per distinct value."""
+    codes, uniques = _factorize(values)
+    position = {name: i for i, name in enumerate(dtype.categories)}
+    value_codes = np.fromiter((position.get(func(v), -1) for v in uniques), dtype=np.int64, count=len(uniques))
+    value_codes = np.append(value_codes, -1)  # missing inputs (code -1) stay missing
+    return pd.Categorical.from_codes(value_codes[codes], dtype=dtype)
+
+
+def _factorize(values):
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories.to_numpy(object)
+    return pd.factorize(values.to_numpy(object))
+
+
+def load_login_teams(path=TEAMS_PATH):
+    teams_df = pd.read_csv(path, sep="\t", engine="python")
+    teams_df.columns = teams_df.columns.str.strip().str.lower()
+    return dict(zip(teams_df["login"], teams_df["team"]))
+
+
+@lru_cache(maxsize=1)
+def default_index():
+    """Index over TEAM_COLORS and teams.csv, built once per process."""
+    return TeamIndex(TEAM_COLORS, load_login_teams())
@@ -5,6 +5,7 @@ from io import StringIO
 import os
 import aiohttp
 import asyncio
+from map_catalog import load_catalog, load_uid_list
 
 
 CLEAN_REGEX = re.compile(r"(\$[0-9a-fA-F]{3})|(\$[wWtTzZiIoOsSgGnNmM])|(\$[hHlL](\[.*\])?)")
@@ -83,13 +84,8 @@ def save_records(uid, df):
     df.to_csv(path, index=False)
 
 def load_uids(file_path="maps.txt"):
-    uids = []
-    with open(file_path, "r") as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith("#"):
-                uids.append(line)
-    return uids
+    # Parsed once per version of the file (see map_catalog)
+    return load_uid_list(file_path)
 
 def add_uid(uid, file_path="maps.txt", max_uids=100):
     """Add a UID to maps.txt if it doesn't already exist."""
@@ -150,11 +146,8 @@ def load_uid_map(path="maps_dict.txt"):
     """
     Load a TSV with UID + Name.
     Builds a dict keyed by whatever is between the first *...* in the name.
+    Parsed once per version of the file (see map_catalog.load_catalog).
     """
-    df = pd.read_csv(path, sep="\t", header=None, names=["uid", "name"])
-    # extract whatever is between the first pair of *...*
-    df["short_key"] = df["name"].str.extract(r"\*(.*?)\*")  # non-greedy
-    # create a dict short_key(lower) -> uid
-    key_to_uid = {k.lower(): v for k, v in zip(df.short_key, df.uid)}
-    uid_to_name = dict(zip(df.uid, df.name))
-    return uid_to_name, key_to_uid
+    catalog = load_catalog(path)
+    # copies: callers may modify their dicts
+    return dict(catalog.uid_to_name), dict(catalog.key_to_uid)
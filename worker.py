@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Standalone fetch worker.
+
+Runs the refresh scheduler in its own process and publishes every snapshot
+to a memory-mapped file (see shared_snapshot.py). Start one worker, then any
+number of UI processes with DEDI_WORKER=external:
+
+    python worker.py
+    DEDI_WORKER=external streamlit run app.py
+"""
+import sys
+import pandas as pd
+from dotenv import load_dotenv
+load_dotenv()
+import fetcher
+from panels import materialize
+from shared_snapshot import SHARED_PATH, read_version, write_shared
+from store import load_snapshot
+
+
+def main(path=SHARED_PATH, budget_per_hour=None):
+    # Same pandas semantics as the UI processes (see app.py)
+    pd.set_option("mode.copy_on_write", True)
+
+    # Keep versions increasing across worker restarts so attached readers notice
+    fetcher.snapshots.continue_from(read_version(path))
+    fetcher.publish_hooks.append(lambda snapshot: write_shared(snapshot, path))
+
+    # Serve the last stored records until the first fetch lands
+    snapshot = fetcher.snapshots.publish_if_empty(lambda: materialize(load_snapshot()))
+    write_shared(snapshot, path)
+    print(f"📡 Shared snapshot v{snapshot.version} at {path}")
+    sys.stdout.flush()
+
+    fetcher.background_fetch_loop(budget_per_hour)
+
+
+if __name__ == "__main__":
+    main()